@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+import os
+import shutil
+import sqlite3
+import struct
+import hashlib
+import sys
+from datetime import datetime, timedelta
+
+# 這支模組是產出物的內容定址儲存區（content-addressed store）：
+#   - 實體檔案只存一份：artifact_store/objects/<hash 前兩碼>/<hash><副檔名>
+#   - banners/、rename_banners/ 等原本的資料夾都是指向 objects 的 hard link
+#   - artifact_store/index.sqlite 記錄每次 run 產出了什麼（目標、品牌、分數、尺寸、上傳狀態）
+# 只用標準函式庫，任何步驟都可以直接 import。
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+STORE_DIR = os.path.join(script_dir, '..', 'artifact_store')
+# 已上傳且超過這個天數沒有再產出的 object 會被 prune 移除（index.sqlite 的紀錄保留）
+RETENTION_DAYS = 30
+# 只留在本機、沒有上傳步驟的 kind（原始 banner 截圖由 rename_banners 上傳）：
+# 不列入待上傳清單，prune 時只看存放天數
+LOCAL_KINDS = ('banners',)
+_LOCAL_KINDS_SQL = f"({', '.join('?' * len(LOCAL_KINDS))})"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS objects (
+    hash       TEXT PRIMARY KEY,
+    ext        TEXT NOT NULL,
+    size       INTEGER NOT NULL,
+    width      INTEGER,
+    height     INTEGER,
+    first_seen TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS artifacts (
+    id             INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id         TEXT NOT NULL,
+    kind           TEXT NOT NULL,
+    name           TEXT NOT NULL,
+    hash           TEXT NOT NULL REFERENCES objects(hash),
+    target         TEXT,
+    brand          TEXT,
+    score          REAL,
+    created_at     TEXT NOT NULL,
+    uploaded_at    TEXT,
+    drive_file_id  TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_artifacts_hash   ON artifacts(hash);
+CREATE INDEX IF NOT EXISTS idx_artifacts_brand  ON artifacts(brand);
+CREATE INDEX IF NOT EXISTS idx_artifacts_target ON artifacts(target);
+CREATE INDEX IF NOT EXISTS idx_artifacts_run    ON artifacts(run_id);
+"""
+
+
+def current_run_id() -> str:
+    """GitHub Actions 上使用 GITHUB_RUN_ID，本機則用啟動時間"""
+    return os.environ.get('GITHUB_RUN_ID') or datetime.now().strftime('local-%Y%m%d-%H%M%S')
+
+
+def file_hash(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def image_size(path: str) -> tuple[int | None, int | None]:
+    """只讀 PNG 檔頭取得寬高，不需要解碼整張圖"""
+    with open(path, 'rb') as f:
+        head = f.read(24)
+    if head[:8] == b'\x89PNG\r\n\x1a\n' and head[12:16] == b'IHDR':
+        return struct.unpack('>II', head[16:24])
+    return None, None
+
+
+def release(path: str) -> None:
+    """
+    寫入檔案前先呼叫：若 path 是指向 store 的 hard link，先移除，
+    避免截圖直接覆寫到共用的 object 內容。
+    """
+    if os.path.exists(path) and os.stat(path).st_nlink > 1:
+        os.unlink(path)
+
+
+class ArtifactStore:
+
+    def __init__(self, store_dir: str = STORE_DIR, run_id: str | None = None):
+        self.store_dir = store_dir
+        self.run_id = run_id or current_run_id()
+        os.makedirs(os.path.join(store_dir, 'objects'), exist_ok=True)
+        self.db = sqlite3.connect(os.path.join(store_dir, 'index.sqlite'))
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.db.close()
+
+    def object_path(self, digest: str, ext: str) -> str:
+        return os.path.join(self.store_dir, 'objects', digest[:2], digest + ext)
+
+    def _ingest(self, path: str) -> tuple[str, str]:
+        """把 path 的內容收進 objects（已存在則不再寫入），回傳 (hash, object 路徑)"""
+        digest = file_hash(path)
+        ext = os.path.splitext(path)[1].lower()
+        obj = self.object_path(digest, ext)
+        if os.path.exists(obj):
+            return digest, obj
+        os.makedirs(os.path.dirname(obj), exist_ok=True)
+        width, height = image_size(path)
+        try:
+            os.link(path, obj)
+        except OSError:
+            shutil.copy2(path, obj)
+        self.db.execute(
+            "INSERT OR IGNORE INTO objects (hash, ext, size, width, height, first_seen) VALUES (?, ?, ?, ?, ?, ?)",
+            (digest, ext, os.path.getsize(obj), width, height, datetime.now().isoformat(timespec='seconds')),
+        )
+        return digest, obj
+
+    def _link_view(self, obj: str, view_path: str) -> None:
+        """讓 view_path 成為 obj 的 hard link；已經是同一個 inode 時不做任何 I/O"""
+        if os.path.exists(view_path):
+            if os.path.samefile(obj, view_path):
+                return
+            os.unlink(view_path)
+        os.makedirs(os.path.dirname(os.path.abspath(view_path)), exist_ok=True)
+        try:
+            os.link(obj, view_path)
+        except OSError:
+            # 跨檔案系統等無法 hard link 的情況退回複製
+            shutil.copy2(obj, view_path)
+
+    def _record(self, digest: str, view_path: str, kind: str, target, brand, score) -> None:
+        self.db.execute(
+            "INSERT INTO artifacts (run_id, kind, name, hash, target, brand, score, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (self.run_id, kind, os.path.basename(view_path), digest, target, brand, score,
+             datetime.now().isoformat(timespec='seconds')),
+        )
+        self.db.commit()
+
+    def put(self, path: str, kind: str, *, target: str | None = None,
+            brand: str | None = None, score: float | None = None) -> str:
+        """收錄剛產生的檔案，path 本身變成指向 object 的 hard link；回傳 hash"""
+        digest, obj = self._ingest(path)
+        self._link_view(obj, path)
+        self._record(digest, path, kind, target, brand, score)
+        return digest
+
+    def link(self, src_path: str, view_path: str, kind: str, *, target: str | None = None,
+             brand: str | None = None, score: float | None = None) -> str:
+        """取代 shutil.copy：把 src_path 的內容以 hard link 放到 view_path；回傳 hash"""
+        digest, obj = self._ingest(src_path)
+        self._link_view(obj, view_path)
+        self._record(digest, view_path, kind, target, brand, score)
+        return digest
+
+    def mark_uploaded(self, path: str, drive_file_id: str | None) -> int:
+        """記錄上傳結果，回傳更新的筆數（path 不在 store 中時為 0）"""
+        cur = self.db.execute(
+            "UPDATE artifacts SET uploaded_at = ?, drive_file_id = ? "
+            "WHERE hash = ? AND name = ? AND uploaded_at IS NULL",
+            (datetime.now().isoformat(timespec='seconds'), drive_file_id, file_hash(path), os.path.basename(path)),
+        )
+        self.db.commit()
+        return cur.rowcount
+
+    def first_seen(self, *, brand: str | None = None, target: str | None = None, digest: str | None = None):
+        """某品牌 / 目標 / 內容第一次出現的紀錄"""
+        clauses, params = [], []
+        for col, val in (('brand', brand), ('target', target), ('hash', digest)):
+            if val is not None:
+                clauses.append(f"{col} = ?")
+                params.append(val)
+        where = ' AND '.join(clauses) or '1'
+        return self.db.execute(
+            f"SELECT * FROM artifacts WHERE {where} ORDER BY created_at, id LIMIT 1", params
+        ).fetchone()
+
+    def history(self, *, brand: str | None = None, target: str | None = None, limit: int = 50):
+        clauses, params = [], []
+        for col, val in (('brand', brand), ('target', target)):
+            if val is not None:
+                clauses.append(f"{col} = ?")
+                params.append(val)
+        where = ' AND '.join(clauses) or '1'
+        return self.db.execute(
+            f"SELECT a.*, o.width, o.height, o.size FROM artifacts a JOIN objects o USING (hash) "
+            f"WHERE {where} ORDER BY a.created_at DESC, a.id DESC LIMIT ?", (*params, limit)
+        ).fetchall()
+
+    def pending_uploads(self, kind: str | None = None):
+        """尚未上傳的產出；未指定 kind 時不含 LOCAL_KINDS"""
+        sql = "SELECT * FROM artifacts WHERE uploaded_at IS NULL"
+        if kind:
+            sql += " AND kind = ?"
+            params = (kind,)
+        else:
+            sql += f" AND kind NOT IN {_LOCAL_KINDS_SQL}"
+            params = LOCAL_KINDS
+        return self.db.execute(sql + " ORDER BY id", params).fetchall()
+
+    def uploaded(self, kind: str | None = None):
+        sql = "SELECT * FROM artifacts WHERE uploaded_at IS NOT NULL"
+        params = ()
+        if kind:
+            sql += " AND kind = ?"
+            params = (kind,)
+        return self.db.execute(sql + " ORDER BY id", params).fetchall()
+
+    def prune(self, max_age_days: float = RETENTION_DAYS) -> dict:
+        """
+        刪除所有產出都已上傳（LOCAL_KINDS 不需上傳）、且最後一次產出早於 max_age_days 天前的
+        object 檔案，回傳修剪統計。
+        只動 objects/，index.sqlite 的紀錄保留，first-seen / history 仍可查詢；
+        同樣的內容之後再出現時 _ingest 會重新寫入檔案。
+        """
+        cutoff = (datetime.now() - timedelta(days=max_age_days)).isoformat(timespec='seconds')
+        rows = self.db.execute(
+            "SELECT o.hash, o.ext FROM objects o LEFT JOIN artifacts a USING (hash) "
+            "GROUP BY o.hash "
+            "HAVING SUM(a.id IS NOT NULL AND a.uploaded_at IS NULL "
+            f"AND a.kind NOT IN {_LOCAL_KINDS_SQL}) = 0 "
+            "AND COALESCE(MAX(a.created_at), o.first_seen) < ?",
+            (*LOCAL_KINDS, cutoff),
+        ).fetchall()
+        removed = removed_bytes = 0
+        for row in rows:
+            obj = self.object_path(row['hash'], row['ext'])
+            try:
+                size = os.path.getsize(obj)
+                os.remove(obj)
+            except OSError:
+                continue
+            removed += 1
+            removed_bytes += size
+        print(f"[Store] 已移除 {removed} 個超過 {max_age_days:g} 天且不需保留的 object（{removed_bytes / 1024 / 1024:.1f}MB）")
+        return {'removed': removed, 'removed_bytes': removed_bytes}
+
+
+if __name__ == '__main__':
+    # 參數解析統一在 cli.py
+    from cli import main
+    sys.exit(main(['store', *sys.argv[1:]]))
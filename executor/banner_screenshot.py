@@ -1,10 +1,15 @@
 # screenshot.py
 import asyncio
-import argparse
+import sys
 import os
+import time
 from playwright.async_api import async_playwright
 from login import launch_and_login, HOME_URL
-from observe_banner_rotations import observe_banner_rotations
+from artifact_store import ArtifactStore, release
+from observe_banner_rotations import observe_banner_rotations, observe_all_carousels, DEFAULT_CONTAINER
+from page_metrics import PageMetrics, write_metrics, write_run_report
+from readiness import track_network, wait_until_ready
+from screencast import Screencaster
 from datetime import datetime
 
 # 取得這支 script 的資料夾
@@ -16,21 +21,32 @@ ROTATION_INTERVAL = 3000
 # 最多截圖張數（避免無限）
 MAX_SLIDES = 50
 
-async def take_screenshots(email: str, password: str):
+async def take_screenshots(email: str, password: str, collect_metrics: bool = False,
+                           all_carousels: bool = False, carousel_selector: str = DEFAULT_CONTAINER,
+                           backend: str = 'screenshot', screencast_format: str = 'png',
+                           persistent_profile: bool = False):
+    if backend == 'screencast' and all_carousels:
+        # screencast 只有 viewport 畫面，其他輪播的元素截圖會捲動頁面，兩者無法同時使用
+        raise ValueError("screencast 模式只支援首頁大輪播，不能與 --all-carousels 一起使用")
     print("[Screenshot] 啟動 Playwright 自動化")
     async with async_playwright() as p:
         # 登入
-        page = await launch_and_login(email=email, password=password)
+        page = await launch_and_login(email=email, password=password, persistent=persistent_profile)
         print("[Screenshot] 登入完成，開始截圖流程。")
 
         await page.set_viewport_size({"width": 1280, "height": 800})
         print("[Screenshot] 已設定視窗大小為 1280x800")
 
+        track_network(page)
+        metrics = PageMetrics(page) if collect_metrics else None
+        if metrics:
+            await metrics.start()
         await page.goto(HOME_URL)
-        await page.wait_for_selector('.carousel-container', timeout=10000)
+        await page.wait_for_selector(carousel_selector, timeout=10000)
         print(f"[Screenshot] 已導航至 {HOME_URL} 並偵測到 carousel-container")
 
-        await page.wait_for_timeout(2000)
+        # 輪播本身一直在動，穩定與否交給 observe_banner_rotations 判斷，這裡不等 animations
+        readiness = await wait_until_ready(page, animations=False, label="banner")
 
         selector = (
             'div.bg_sbds-background-color-dark'
@@ -45,40 +61,111 @@ async def take_screenshots(email: str, password: str):
             y_offset = 0
 
         # 計算輪播張數
-        wrapper = page.locator('.carousel-container').first
+        wrapper = page.locator(carousel_selector).first
         img_count = await wrapper.locator('> div[data-ui-element-name="hero banner"]').count()
         print(f"[Screenshot] 輪播中共偵測到 {img_count} 個 banner 項目")
 
+        store = ArtifactStore()
+        screencaster = None
+        if backend == 'screencast':
+            screencaster = Screencaster(page, fmt=screencast_format, motion_selector=carousel_selector)
+            await screencaster.start()
+        ext = '.jpg' if screencaster and screencast_format == 'jpeg' else '.png'
+
+        # 多個輪播並行截圖時，捲動 + 截圖必須是一個不可分割的動作
+        shot_lock = asyncio.Lock()
+        # 本次截到的 banner（相對於 OUTPUT_DIR），寫進 metrics
+        captured: list[str] = []
+
+        async def capture_hero(filename: str, event_ts: float, settled_ts: float):
+            # 首頁大輪播沿用視窗裁切，後續 icon 比對的座標以此為準
+            if screencaster:
+                release(filename)
+                vp = page.viewport_size
+                clip = {"x": 0, "y": y_offset, "width": vp["width"], "height": vp["height"] - y_offset} if y_offset else None
+                await screencaster.save_frame_at(event_ts, filename, clip=clip, settled_at=settled_ts)
+                return
+            async with shot_lock:
+                if all_carousels:
+                    # 其他輪播的元素截圖可能把頁面捲走，先捲回頂端
+                    await page.evaluate("() => window.scrollTo(0, 0)")
+                release(filename)
+                await page.screenshot(path=filename, clip={
+                    "x": 0,
+                    "y": y_offset,
+                    "width": await page.evaluate("() => window.innerWidth"),
+                    "height": (await page.evaluate("() => window.innerHeight")) - y_offset
+                })
+
         # 定義 callback：每次切換完成就截圖
-        async def on_switch(call_index: int, current_index: int):
-            filename = os.path.join(OUTPUT_DIR, f"banner_{call_index}.png")
+        async def on_switch(call_index: int, current_index: int, event_ts: float, settled_ts: float):
+            filename = os.path.join(OUTPUT_DIR, f"banner_{call_index}{ext}")
             print(f"[Screenshot] 觸發第 {call_index} 次（索引 {current_index}）→ 截圖：{filename}")
-            await page.screenshot(path=filename, clip={
-                "x": 0,
-                "y": y_offset,
-                "width": await page.evaluate("() => window.innerWidth"),
-                "height": (await page.evaluate("() => window.innerHeight")) - y_offset
-            })
-
-        # 觀察並觸發截圖：
-        # - include_initial=True：先對目前第一張也截 1 次
-        # - max_switches=img_count：總共觸發 img_count 次（含第一張）
-        await observe_banner_rotations(
-            page,
-            on_switch,
-            max_switches=img_count,
-            include_initial=True,
-            stable_frames=10,
-            velocity_eps=0.5,
-        )
+            await capture_hero(filename, event_ts, settled_ts)
+            store.put(filename, 'banners', target=f"{HOME_URL}#hero-{current_index}")
+            captured.append(os.path.relpath(filename, OUTPUT_DIR))
+
+        start = time.perf_counter()
+        if all_carousels:
+            async def on_carousel_switch(carousel_index: int, call_index: int, current_index: int,
+                                         event_ts: float, settled_ts: float):
+                if carousel_index == 0:
+                    await on_switch(call_index, current_index, event_ts, settled_ts)
+                else:
+                    # 其他輪播只截輪播本身的可視區（container 的父元素），各自放在子資料夾
+                    filename = os.path.join(OUTPUT_DIR, f"carousel_{carousel_index}", f"banner_{call_index}.png")
+                    os.makedirs(os.path.dirname(filename), exist_ok=True)
+                    print(f"[Screenshot] 輪播 {carousel_index} 第 {call_index} 次（索引 {current_index}）→ 截圖：{filename}")
+                    viewport = page.locator(carousel_selector).nth(carousel_index).locator('xpath=..')
+                    async with shot_lock:
+                        release(filename)
+                        await viewport.screenshot(path=filename)
+                    store.put(filename, 'banners', target=f"{HOME_URL}#carousel-{carousel_index}-{current_index}")
+                    captured.append(os.path.relpath(filename, OUTPUT_DIR))
+
+            # 所有輪播共用同一次頁面載入，各自的 watcher 並行觀察
+            carousels = await observe_all_carousels(
+                page,
+                on_carousel_switch,
+                container_selector=carousel_selector,
+                include_initial=True,
+                stable_frames=10,
+                velocity_eps=0.5,
+                pass_event_time=True,
+            )
+            for i, c in enumerate(carousels):
+                print(f"[Screenshot] 輪播 {i} 結束於 {c['seconds']:.1f}s（{c['captured']} / {c['slides']} 張）")
+        else:
+            # 觀察並觸發截圖：
+            # - include_initial=True：先對目前第一張也截 1 次
+            # - max_switches=img_count：總共觸發 img_count 次（含第一張）
+            await observe_banner_rotations(
+                page,
+                on_switch,
+                container_selector=carousel_selector,
+                max_switches=img_count,
+                include_initial=True,
+                stable_frames=10,
+                velocity_eps=0.5,
+                pass_event_time=True,
+            )
+        print(f"[Screenshot] 輪播截圖總耗時 {time.perf_counter() - start:.1f}s")
+
+        screencast_stats = await screencaster.stop() if screencaster else None
+
+        if metrics:
+            # 整個首頁只導航一次，所有 banner 共用一份數據，以 home 為名寫成 home.metrics.json
+            extra = {"screencast": screencast_stats} if screencast_stats else {}
+            metrics_path = write_metrics(os.path.join(OUTPUT_DIR, "home"), await metrics.collect(),
+                                         readiness=readiness, artifacts=sorted(captured), **extra)
+            await metrics.stop()
+            write_run_report(OUTPUT_DIR, [metrics_path])
 
+        store.close()
         await page.context.close()
         print("[Screenshot] 截圖流程結束，瀏覽器已關閉。")
 
 if __name__ == '__main__':
-    parser = argparse.ArgumentParser(description="Screenshot banners")
-    parser.add_argument('-a', '--account', required=True, help='ShopBack login email')
-    parser.add_argument('-p', '--password', required=True, help='ShopBack login password')
-    args = parser.parse_args()
-        
-    asyncio.run(take_screenshots(email=args.account, password=args.password))
+    # 參數解析統一在 cli.py
+    from cli import main
+    sys.exit(main(['capture', 'banners', *sys.argv[1:]]))
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+from contextlib import redirect_stdout
+
+from fake_drive import FakeDrive, start_server, build_client
+from upload_google_drive import upload_folder_to_drive
+from download_google_drive import list_folder_files, download_file
+
+# 以 fake_drive.py 模擬 Google Drive，量測現有上傳 / 下載程式碼在不同資料夾大小下的吞吐量：
+#   - files/s、MB/s（以檔案內容計，不含 HTTP overhead）
+#   - 伺服器注入的 429 / 5xx 次數（= client 端重試次數）與重試用盡後失敗的檔案數
+# 延遲、頻寬與錯誤率都可調整；googleapiclient 的 backoff 照常執行，計入耗時。
+
+FOLDER_ID = 'bench-folder'
+
+
+def make_folder(root: str, files: int, size: int) -> str:
+    folder = os.path.join(root, f"upload_{files}")
+    os.makedirs(folder)
+    for i in range(files):
+        with open(os.path.join(folder, f"banner_{i:04d}.png"), 'wb') as f:
+            f.write(os.urandom(size))
+    return folder
+
+
+def summarize(count: int, nbytes: int, seconds: float, failed: int, stats: dict) -> dict:
+    return {
+        'seconds': round(seconds, 3),
+        'files_per_s': round(count / seconds, 2) if seconds else None,
+        'mb_per_s': round(nbytes / seconds / 1024 / 1024, 2) if seconds else None,
+        'retries': stats['injected_errors'],
+        'failed': failed,
+        'requests': stats['requests'],
+        'by_op': stats['by_op'],
+    }
+
+
+def run_size(args, root: str, files: int) -> dict:
+    drive = FakeDrive(latency=args.latency / 1000, bandwidth=args.bandwidth * 1024 * 1024,
+                      error_rate=args.error_rate, seed=args.seed)
+    server = start_server(drive)
+    client = build_client(f"http://127.0.0.1:{server.server_address[1]}/")
+    size = int(args.file_kb * 1024)
+    chunksize = int(args.chunk_size * 1024 * 1024) if args.chunk_size else None
+    folder = make_folder(root, files, size)
+    dest = os.path.join(root, f"download_{files}")
+    os.makedirs(dest)
+    try:
+        # 上傳：與 cli.py drive upload 同一條路徑；程式本身的逐檔輸出不列入報告
+        start = time.perf_counter()
+        with redirect_stdout(io.StringIO()):
+            _, results = upload_folder_to_drive(client, folder, parent_folder_id=FOLDER_ID,
+                                                num_retries=args.retries, chunksize=chunksize)
+        elapsed = time.perf_counter() - start
+        uploaded = [r for r in results if r['status'] == 'ok']
+        upload = summarize(len(uploaded), len(uploaded) * size, elapsed, len(results) - len(uploaded), drive.snapshot())
+
+        # 下載：分頁列出後逐一下載，並比對內容
+        drive.reset_stats()
+        start = time.perf_counter()
+        with redirect_stdout(io.StringIO()):
+            listed = list_folder_files(client, FOLDER_ID, num_retries=args.retries)
+            paths = [download_file(client, f['id'], f['name'], dest, num_retries=args.retries, chunksize=chunksize)
+                     for f in listed]
+        elapsed = time.perf_counter() - start
+        ok = [p for p in paths if p]
+        download = summarize(len(ok), sum(os.path.getsize(p) for p in ok), elapsed, len(paths) - len(ok), drive.snapshot())
+
+        mismatched = 0
+        for p in ok:
+            with open(p, 'rb') as a, open(os.path.join(folder, os.path.basename(p)), 'rb') as b:
+                mismatched += a.read() != b.read()
+        download['listed'] = len(listed)
+        download['mismatched'] = mismatched
+        return {'files': files, 'file_kb': args.file_kb, 'upload': upload, 'download': download}
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def main(args) -> int:
+    root = tempfile.mkdtemp(prefix='bench_drive_')
+    mode = f"resumable {args.chunk_size}MB" if args.chunk_size else 'multipart'
+    print(f"[Bench] upload={mode} latency={args.latency}ms bandwidth={args.bandwidth or '∞'}MB/s "
+          f"error_rate={args.error_rate} retries={args.retries}")
+    print(f"[Bench] {'files':>6} {'phase':<9} {'sec':>8} {'files/s':>8} {'MB/s':>7} {'retries':>7} {'failed':>6}")
+    rows = []
+    broken = False
+    try:
+        for files in args.sizes:
+            row = run_size(args, root, files)
+            rows.append(row)
+            for phase in ('upload', 'download'):
+                r = row[phase]
+                print(f"[Bench] {files:>6} {phase:<9} {r['seconds']:>8.2f} {r['files_per_s']:>8.1f} "
+                      f"{r['mb_per_s']:>7.2f} {r['retries']:>7} {r['failed']:>6}")
+            # 沒有失敗時，上傳與列出的數量、下載內容都必須一致
+            if not row['upload']['failed'] and not row['download']['failed'] and (
+                    row['download']['listed'] != files or row['download']['mismatched']):
+                print(f"[Bench] ❌ {files} 個檔案的資料夾：列出 {row['download']['listed']} 個、"
+                      f"內容不符 {row['download']['mismatched']} 個")
+                broken = True
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'mode': mode, 'latency_ms': args.latency, 'bandwidth_mb_s': args.bandwidth,
+                       'error_rate': args.error_rate, 'retries': args.retries, 'results': rows},
+                      f, ensure_ascii=False, indent=2)
+        print(f"[Bench] 已寫入 {args.output}")
+    return 1 if broken else 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark Drive upload/download against a local fake Drive v3 server")
+    parser.add_argument('--sizes', type=lambda s: [int(v) for v in s.split(',')], default=[10, 50, 200],
+                        help='資料夾檔案數，逗號分隔 (default: 10,50,200)')
+    parser.add_argument('--file-kb', type=float, default=200, help='每個檔案大小（KB）')
+    parser.add_argument('--latency', type=float, default=20, help='每個請求的延遲（毫秒）')
+    parser.add_argument('--bandwidth', type=float, default=0, help='每個連線的頻寬上限（MB/s），0 表示不限')
+    parser.add_argument('--error-rate', type=float, default=0.02, help='隨機回傳 429 / 5xx 的機率')
+    parser.add_argument('--retries', type=int, default=5, help='client 端 num_retries')
+    parser.add_argument('--chunk-size', type=float, default=None, help='(Optional) resumable / Range 分段大小（MB）')
+    parser.add_argument('--seed', type=int, default=1, help='錯誤注入的亂數種子')
+    parser.add_argument('--output', default=None, help='(Optional) JSON 報告輸出路徑')
+    sys.exit(main(parser.parse_args()))
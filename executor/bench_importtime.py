@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+# 以 python -X importtime 量測 cli.py 各子指令的啟動成本，防止啟動時間回退：
+#   1) 每個子指令都不能載入它用不到的重量級套件（與機器快慢無關，一定要過）
+#   2) import 總時間不能超過該子指令的絕對上限（BUDGET_MS，留足 CI runner 較慢的餘裕，不需要 baseline）
+#   3) 有 baseline 時，import 總時間不能超過 baseline 的 tolerance 倍
+#      baseline 與機器相關，不進版控：先在本機用 --update 產生，之後在同一台機器上比較
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+CLI = os.path.join(script_dir, 'cli.py')
+BASELINE_FILE = os.path.join(script_dir, 'importtime_baseline.json')
+
+HEAVY = ('cv2', 'numpy', 'PIL', 'googleapiclient', 'google_auth_oauthlib', 'playwright', 'pytz')
+
+# (名稱, cli 參數, 不允許載入的套件, import 總時間上限 ms)
+CASES = [
+    ('help',             ['--help'],                                          HEAVY, 250),
+    ('store',            ['store', 'pending'],                                HEAVY, 250),
+    ('crop',             ['crop', 'x.png'],                                   ('googleapiclient', 'google_auth_oauthlib', 'playwright', 'pytz'), 250),
+    ('match',            ['match'],                                           ('googleapiclient', 'google_auth_oauthlib', 'playwright', 'PIL'), 800),
+    ('drive upload',     ['drive', 'upload', '-j', '{}', '-l', '.'],          ('cv2', 'numpy', 'PIL', 'playwright', 'google_auth_oauthlib'), 1500),
+    ('drive download',   ['drive', 'download', '-j', '{}', '-f', 'x'],        ('cv2', 'numpy', 'PIL', 'playwright', 'google_auth_oauthlib'), 1500),
+    ('capture banners',  ['capture', 'banners', '-a', 'x', '-p', 'x'],        ('cv2', 'numpy', 'PIL', 'googleapiclient'), 800),
+    ('capture fullpage', ['capture', 'fullpage', '-a', 'x', '-p', 'x', '-u', 'x', '-n', 'x'], ('cv2', 'numpy', 'PIL', 'googleapiclient'), 800),
+    ('capture section',  ['capture', 'section', '-a', 'x', '-p', 'x'],        ('cv2', 'numpy', 'PIL', 'googleapiclient'), 800),
+]
+
+
+def measure(cli_args: list[str]) -> tuple[int, set[str]]:
+    """回傳 (top-level import 的 cumulative 總和 us, 載入過的頂層套件名稱)"""
+    argv = cli_args if cli_args == ['--help'] else ['--import-only', *cli_args]
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', CLI, *argv],
+        cwd=script_dir, capture_output=True, text=True,
+    )
+    total = 0
+    modules = set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|', 2)
+        modules.add(name.strip().split('.')[0])
+        # 沒有縮排的是被直接 import 的頂層模組，加總即為整體 import 時間
+        if not name.startswith('  '):
+            total += int(cumulative)
+    if proc.returncode != 0:
+        raise RuntimeError(f"cli.py {' '.join(argv)} 失敗：{proc.stderr.strip().splitlines()[-1:]}")
+    return total, modules
+
+
+def main(args) -> int:
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    results = {}
+    failed = False
+    for name, cli_args, forbidden, budget_ms in CASES:
+        runs = [measure(cli_args) for _ in range(args.repeat)]
+        total = min(t for t, _ in runs)
+        modules = runs[0][1]
+        results[name] = total
+
+        leaked = sorted(set(forbidden) & modules)
+        base = baseline.get(name)
+        status = 'OK'
+        if leaked:
+            status = f"FAIL（載入了不需要的套件：{', '.join(leaked)}）"
+            failed = True
+        elif total > budget_ms * 1000:
+            status = f"FAIL（超過上限 {budget_ms}ms）"
+            failed = True
+        elif base and not args.update and total > base * args.tolerance:
+            status = f"FAIL（超過 baseline {base / 1000:.1f}ms 的 {args.tolerance} 倍）"
+            failed = True
+        print(f"[Bench] {name:<18} {total / 1000:8.1f} ms  {status}")
+
+    if args.update:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"[Bench] 已更新 baseline：{args.baseline}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Guard cli.py startup time with python -X importtime")
+    parser.add_argument('--baseline', default=BASELINE_FILE, help='baseline JSON 路徑')
+    parser.add_argument('--tolerance', type=float, default=1.5, help='允許超過 baseline 的倍數')
+    parser.add_argument('--repeat', type=int, default=3, help='每個子指令量測次數（取最小值）')
+    parser.add_argument('--update', action='store_true', help='以這次的量測結果覆寫 baseline')
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+import time
+import shutil
+import socket
+import asyncio
+from datetime import datetime
+from playwright.async_api import BrowserContext, BrowserType, Page, Error as PlaywrightError
+
+# 這支模組管理 launch_and_login 的持久化 Chromium profile（launch_persistent_context）：
+#   - HTTP cache、Code Cache 與 service worker 跨次執行保留，重複造訪的靜態資源不必重抓
+#   - 啟動前依大小與存放時間修剪 cache（service worker 不動）
+#   - Preferences / Local State 損毀或啟動失敗時，把 profile 移到一旁並改用全新的 profile
+#   - 以 CDP Network 事件統計 cache 命中率，context 關閉時寫出 cache_stats.json
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+PROFILE_DIR = os.path.join(script_dir, '..', 'browser_profile')
+# 修剪上限：cache 總大小（MB）與檔案存放天數
+MAX_CACHE_MB = 300
+MAX_CACHE_AGE_DAYS = 14
+STATS_FILE = 'cache_stats.json'
+
+# 會被修剪的 cache 資料夾（相對於 profile）；index 檔保留，Chromium 會自行修正遺失的項目
+CACHE_DIRS = (
+    os.path.join('Default', 'Cache', 'Cache_Data'),
+    os.path.join('Default', 'Code Cache', 'js'),
+    os.path.join('Default', 'Code Cache', 'wasm'),
+)
+CACHE_KEEP = {'index', 'the-real-index'}
+# 啟動時必須是合法 JSON 的檔案，壞掉通常代表上次執行中途被砍
+JSON_FILES = ('Local State', os.path.join('Default', 'Preferences'))
+SINGLETON_FILES = ('SingletonLock', 'SingletonSocket', 'SingletonCookie')
+
+
+def prune_cache(profile_dir: str, max_mb: float = MAX_CACHE_MB, max_age_days: float = MAX_CACHE_AGE_DAYS) -> dict:
+    """先刪超過 max_age_days 的 cache 檔，再由舊到新刪到總大小低於 max_mb；回傳修剪統計"""
+    entries = []
+    for rel in CACHE_DIRS:
+        for root, _, files in os.walk(os.path.join(profile_dir, rel)):
+            for name in files:
+                if name in CACHE_KEEP:
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((max(st.st_atime, st.st_mtime), st.st_size, path))
+
+    cutoff = time.time() - max_age_days * 86400
+    limit = max_mb * 1024 * 1024
+    total = sum(size for _, size, _ in entries)
+    removed = removed_bytes = 0
+    for ts, size, path in sorted(entries):
+        if ts >= cutoff and total <= limit:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+        removed_bytes += size
+
+    stats = {'files': len(entries) - removed, 'bytes': total, 'removed': removed, 'removed_bytes': removed_bytes}
+    print(f"[Profile] cache {total / 1024 / 1024:.1f}MB（{stats['files']} 個檔案），"
+          f"已修剪 {removed} 個 / {removed_bytes / 1024 / 1024:.1f}MB")
+    return stats
+
+
+def _lock_owner_alive(profile_dir: str) -> bool:
+    """SingletonLock 是指向 '<hostname>-<pid>' 的 symlink；同一台機器上該 pid 還活著才算被占用"""
+    try:
+        target = os.readlink(os.path.join(profile_dir, 'SingletonLock'))
+    except OSError:
+        return False
+    host, _, pid = target.rpartition('-')
+    if host != socket.gethostname() or not pid.isdigit():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def check_profile(profile_dir: str) -> str | None:
+    """profile 看起來損毀時回傳原因，否則回傳 None"""
+    for rel in JSON_FILES:
+        path = os.path.join(profile_dir, rel)
+        if not os.path.exists(path):
+            continue
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                json.load(f)
+        except (OSError, ValueError) as e:
+            return f"{rel} 無法解析（{e.__class__.__name__}）"
+    return None
+
+
+def quarantine(profile_dir: str, reason: str) -> None:
+    """把損毀的 profile 移到 <profile>.corrupt（只保留最近一份供除錯），之後用全新的 profile"""
+    backup = profile_dir.rstrip(os.sep) + '.corrupt'
+    print(f"[Profile] ⚠️ profile 損毀：{reason}，移到 {backup} 並改用全新 profile")
+    shutil.rmtree(backup, ignore_errors=True)
+    if os.path.exists(profile_dir):
+        shutil.move(profile_dir, backup)
+
+
+def prepare_profile(profile_dir: str) -> bool:
+    """啟動前檢查並修剪 profile；回傳 profile 是否為既有的（False 表示全新）"""
+    if not os.path.isdir(profile_dir):
+        return False
+    if _lock_owner_alive(profile_dir):
+        raise RuntimeError(f"profile 正被其他 Chromium 使用中：{profile_dir}")
+    # 上次被砍掉留下的 lock，不清掉 Chromium 會拒絕啟動
+    for name in SINGLETON_FILES:
+        path = os.path.join(profile_dir, name)
+        if os.path.lexists(path):
+            os.remove(path)
+    reason = check_profile(profile_dir)
+    if reason:
+        quarantine(profile_dir, reason)
+        return False
+    prune_cache(profile_dir)
+    return True
+
+
+async def launch_profile(chromium: BrowserType, profile_dir: str = PROFILE_DIR, **kwargs) -> tuple[BrowserContext, bool]:
+    """
+    以 profile_dir 啟動 persistent context，回傳 (context, 是否沿用既有 profile)。
+    既有 profile 啟動失敗時視為損毀，換一個全新的 profile 再試一次。
+    """
+    reused = prepare_profile(profile_dir)
+    os.makedirs(profile_dir, exist_ok=True)
+    try:
+        context = await chromium.launch_persistent_context(profile_dir, **kwargs)
+    except PlaywrightError as e:
+        if not reused:
+            raise
+        quarantine(profile_dir, f"啟動失敗：{str(e).splitlines()[0]}")
+        os.makedirs(profile_dir, exist_ok=True)
+        context = await chromium.launch_persistent_context(profile_dir, **kwargs)
+        reused = False
+    print(f"[Profile] {'沿用既有' if reused else '建立新的'} profile：{os.path.abspath(profile_dir)}")
+    return context, reused
+
+
+class CacheStats:
+    """
+    統計 context 內每個分頁的請求來源：memory cache、disk cache、service worker 或網路。
+    await attach(context) 後自動涵蓋之後開啟的分頁；context 關閉時印出摘要並寫入 STATS_FILE。
+    新分頁的 Network.enable 是非同步完成的，導航前要先 await ready(page)，否則第一個請求會漏算。
+    """
+
+    def __init__(self, profile_dir: str = PROFILE_DIR):
+        self.profile_dir = profile_dir
+        self.counts = {'memory_cache': 0, 'disk_cache': 0, 'service_worker': 0, 'network': 0}
+        self._from_memory: set[str] = set()
+        self._sessions = []
+        self._attaching: dict[Page, asyncio.Future] = {}
+
+    async def attach(self, context: BrowserContext) -> None:
+        context.on("page", self._attach)
+        context.on("close", lambda _: self.report())
+        await asyncio.gather(*(self._attach(page) for page in context.pages))
+
+    async def ready(self, page: Page) -> None:
+        """等到 page 的 CDP Network 事件已經開始統計"""
+        await self._attach(page)
+
+    def _attach(self, page: Page) -> asyncio.Future:
+        # context 的 page 事件與 ready() 可能同時要求同一個分頁，只 attach 一次
+        if page not in self._attaching:
+            self._attaching[page] = asyncio.ensure_future(self._attach_page(page))
+        return self._attaching[page]
+
+    async def _attach_page(self, page: Page) -> None:
+        try:
+            cdp = await page.context.new_cdp_session(page)
+            cdp.on("Network.requestServedFromCache", self._on_served_from_cache)
+            cdp.on("Network.responseReceived", self._on_response)
+            await cdp.send("Network.enable")
+            self._sessions.append(cdp)
+        except PlaywrightError:
+            # 分頁在 attach 前就關掉了
+            pass
+
+    def _on_served_from_cache(self, params: dict) -> None:
+        self._from_memory.add(params["requestId"])
+        self.counts['memory_cache'] += 1
+
+    def _on_response(self, params: dict) -> None:
+        if params["requestId"] in self._from_memory:
+            return
+        response = params["response"]
+        if response.get("fromServiceWorker"):
+            self.counts['service_worker'] += 1
+        elif response.get("fromDiskCache") or response.get("fromPrefetchCache"):
+            self.counts['disk_cache'] += 1
+        elif not response.get("url", "").startswith("data:"):
+            self.counts['network'] += 1
+
+    def summary(self) -> dict:
+        total = sum(self.counts.values())
+        hits = total - self.counts['network']
+        return {**self.counts, 'requests': total, 'hit_rate': round(hits / total, 4) if total else None}
+
+    def report(self) -> dict:
+        stats = {'finished_at': datetime.now().isoformat(timespec='seconds'), **self.summary()}
+        rate = f"{stats['hit_rate']:.1%}" if stats['hit_rate'] is not None else '-'
+        print(f"[Profile] cache 命中率 {rate}：memory={stats['memory_cache']} disk={stats['disk_cache']} "
+              f"service_worker={stats['service_worker']} network={stats['network']}")
+        try:
+            with open(os.path.join(self.profile_dir, STATS_FILE), 'w', encoding='utf-8') as f:
+                json.dump(stats, f, ensure_ascii=False, indent=2)
+        except OSError:
+            pass
+        return stats
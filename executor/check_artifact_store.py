@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+import os
+import sys
+import shutil
+import tempfile
+from contextlib import redirect_stdout
+from io import StringIO
+
+from artifact_store import ArtifactStore, RETENTION_DAYS
+
+# 在暫存資料夾建立 artifact store，確認 prune 真的會讓 store 變小、也不會刪掉還沒上傳的內容：
+#   - 只有原始 banner（LOCAL_KINDS，沒有上傳步驟）的舊 object 要被移除
+#   - 已上傳的舊 object 要被移除；還沒上傳或最近才產出的 object 要保留
+#   - pending 清單不含 LOCAL_KINDS
+# 只用標準函式庫，CI 不需要瀏覽器或 Drive 憑證。
+
+OLD = '2000-01-01T00:00:00'
+
+
+def objects_size(store: ArtifactStore) -> int:
+    total = 0
+    for root, _, files in os.walk(os.path.join(store.store_dir, 'objects')):
+        total += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+    return total
+
+
+def make_file(folder: str, name: str, content: bytes) -> str:
+    path = os.path.join(folder, name)
+    with open(path, 'wb') as f:
+        f.write(content)
+    return path
+
+
+def age(store: ArtifactStore, name: str) -> None:
+    """把某個檔名的紀錄改成很久以前產出"""
+    store.db.execute("UPDATE artifacts SET created_at = ? WHERE name = ?", (OLD, name))
+    store.db.execute("UPDATE objects SET first_seen = ? WHERE hash IN (SELECT hash FROM artifacts WHERE name = ?)",
+                     (OLD, name))
+    store.db.commit()
+
+
+def check(label: str, ok: bool) -> bool:
+    print(f"[Check] {label:<48} {'OK' if ok else 'FAIL'}")
+    return ok
+
+
+def main() -> int:
+    root = tempfile.mkdtemp(prefix='check_store_')
+    views = os.path.join(root, 'views')
+    os.makedirs(views)
+    store = ArtifactStore(os.path.join(root, 'store'), run_id='check')
+    results = []
+    try:
+        # 1) 只有舊的原始 banner：prune 後 objects 應該清空
+        for i in range(3):
+            store.put(make_file(views, f"banner_{i}.png", os.urandom(4096)), 'banners')
+            age(store, f"banner_{i}.png")
+        before = objects_size(store)
+        with redirect_stdout(StringIO()):
+            removed = store.prune(RETENTION_DAYS)['removed']
+        results.append(check('舊的原始 banner 會被移除', removed == 3 and objects_size(store) == 0 < before))
+        results.append(check('pending 清單不含原始 banner', not store.pending_uploads()))
+
+        # 2) 原始 banner 與已上傳的 rename 檔案共用同一個 object
+        src = make_file(views, 'banner_9.png', os.urandom(4096))
+        store.put(src, 'banners')
+        renamed = os.path.join(views, 'web_banner_x.png')
+        store.link(src, renamed, 'rename_banners')
+        store.mark_uploaded(renamed, 'drive-id')
+        age(store, 'banner_9.png')
+        age(store, 'web_banner_x.png')
+        # 3) 還沒上傳的舊產出、最近才產出的原始 banner 都要保留
+        store.put(make_file(views, 'web_banner_y.png', os.urandom(4096)), 'rename_banners')
+        age(store, 'web_banner_y.png')
+        store.put(make_file(views, 'banner_new.png', os.urandom(4096)), 'banners')
+        with redirect_stdout(StringIO()):
+            removed = store.prune(RETENTION_DAYS)['removed']
+        results.append(check('已上傳的舊 object 被移除、其餘保留', removed == 1 and objects_size(store) == 2 * 4096))
+        results.append(check('還沒上傳的舊產出仍在 pending 清單',
+                             [r['name'] for r in store.pending_uploads()] == ['web_banner_y.png']))
+    finally:
+        store.close()
+        shutil.rmtree(root, ignore_errors=True)
+    return 0 if all(results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
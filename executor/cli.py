@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+import sys
+import argparse
+import importlib
+from functools import partial
+
+# 統一的指令入口：
+#   python executor/cli.py capture banners|fullpage|section ...
+#   python executor/cli.py match ...
+#   python executor/cli.py drive upload|download ...
+#   python executor/cli.py crop ...
+#   python executor/cli.py index ... / store ...
+#   python executor/cli.py shard merge ...
+# 這個檔案只 import 標準函式庫；cv2、googleapiclient、Playwright、pytz 等
+# 只在對應的子指令真正執行時才載入，短步驟不必付出載入全部套件的時間。
+# 原本的 executor/*.py 仍可直接執行，只是把參數轉給這裡。
+
+
+# === capture ===
+
+def _capture_banners(args):
+    import asyncio
+    from banner_screenshot import take_screenshots
+    asyncio.run(take_screenshots(email=args.account, password=args.password, collect_metrics=args.metrics,
+                                 all_carousels=args.all_carousels, carousel_selector=args.carousel_selector,
+                                 backend=args.backend, screencast_format=args.screencast_format,
+                                 persistent_profile=args.persistent_profile))
+
+
+def _check_capture_fullpage(parser, args):
+    # 參數組合在載入 Playwright 之前就檢查，錯誤訊息與 argparse 一致
+    if args.no_login and not args.jobs:
+        parser.error("--no-login 只能搭配 --jobs 使用（單頁模式一定要登入）")
+    if not args.no_login and not (args.account and args.password):
+        parser.error("需要 -a/--account 與 -p/--password（或在 --jobs 模式使用 --no-login）")
+    if not args.jobs and not (args.url and args.output_name):
+        parser.error("需要 -u/--url 與 -n/--output_name，或改用 --jobs")
+
+
+def _capture_fullpage(args):
+    import asyncio
+    from full_page_screenshot import capture_full_page_with_playwright, capture_full_page_jobs
+    from sharding import load_jobs
+    if args.jobs:
+        results = asyncio.run(capture_full_page_jobs(
+            email=None if args.no_login else args.account,
+            password=args.password,
+            jobs=load_jobs(args.jobs),
+            shard=args.shard,
+            manifest_path=args.manifest,
+            output_dir=args.output_dir,
+            collect_metrics=args.metrics,
+            persistent_profile=args.persistent_profile,
+            store_dir=args.store_dir,
+        ))
+        return 0 if all(r['status'] == 'ok' for r in results) else 1
+    asyncio.run(capture_full_page_with_playwright(
+        email=args.account,
+        password=args.password,
+        url=args.url,
+        output_name=args.output_name,
+        collect_metrics=args.metrics,
+        persistent_profile=args.persistent_profile,
+    ))
+
+
+def _capture_section(args):
+    import asyncio
+    from rewards_section_screenshot import capture_rewards_section
+    asyncio.run(capture_rewards_section(email=args.account, password=args.password, collect_metrics=args.metrics,
+                                        persistent_profile=args.persistent_profile))
+
+
+def _login(args):
+    import asyncio
+    from login import launch_and_login
+    asyncio.run(launch_and_login(email=args.account, password=args.password, persistent=args.persistent_profile))
+
+
+# === match / crop / index ===
+
+def _match(args):
+    from rename_banner import rename_banners
+    rename_banners(matcher=args.matcher, top_k=args.top_k)
+
+
+def _crop(args):
+    from crop_icon import crop_single
+    crop_single(args.input_image, (args.crop_x, args.crop_y, args.crop_w, args.crop_h))
+
+
+def _index(args):
+    import json
+    from icon_index import evaluate, load_icons, load_or_build_index
+    index = load_or_build_index(args.icons_dir, args.index_file)
+    if args.evaluate:
+        report = evaluate(args.banners_dir, load_icons(args.icons_dir), index, args.threshold, k=args.top_k)
+        if args.report:
+            with open(args.report, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+# === drive ===
+
+def _drive_upload(args):
+    from upload_google_drive import main
+    main(args)
+
+
+def _drive_download(args):
+    from download_google_drive import main
+    main(args)
+
+
+# === shard ===
+
+def _shard_merge(args):
+    import json
+    from sharding import load_jobs, merge_manifests
+    expected = [job['name'] for job in load_jobs(args.jobs)] if args.jobs else None
+    report = merge_manifests(args.manifests, expected)
+    for key in ('missing', 'duplicated', 'unexpected', 'failed'):
+        if report[key]:
+            print(f"[Shard] ❌ {key}: {', '.join(report[key])}")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 0 if report['ok'] else 1
+
+
+# === store ===
+
+def _store(args):
+    from artifact_store import ArtifactStore
+    store = ArtifactStore(args.store_dir)
+    if args.store_command == 'first-seen':
+        row = store.first_seen(brand=args.brand, target=args.target, digest=args.digest)
+        print(dict(row) if row else "[Store] 查無紀錄")
+    elif args.store_command == 'history':
+        for row in store.history(brand=args.brand, target=args.target, limit=args.limit):
+            print(dict(row))
+    elif args.store_command == 'prune':
+        store.prune(args.days)
+    else:
+        for row in store.pending_uploads(args.kind):
+            print(dict(row))
+    store.close()
+
+
+def _add_login_args(p):
+    p.add_argument('-a', '--account', required=True, help='ShopBack login email')
+    p.add_argument('-p', '--password', required=True, help='ShopBack login password')
+    _add_profile_args(p)
+
+
+def _add_profile_args(p):
+    p.add_argument('--persistent-profile', action='store_true',
+                   help='使用持久化的 Chromium profile（保留 HTTP cache 與 service worker，並回報 cache 命中率）')
+
+
+def _add_store_dir_arg(p, default=None):
+    p.add_argument('--store-dir', default=default, help='artifact store 資料夾')
+
+
+def _add_drive_auth_args(p):
+    p.add_argument('-j', '--credentials-json', required=True,
+                   help="OAuth2 or service account JSON string")
+    p.add_argument('--service-account', action='store_true',
+                   help="Interpret credentials JSON as a service account key")
+    p.add_argument('--token-base64', default=None,
+                   help="(Optional) Base64-encoded token.pickle content")
+
+
+def _add_drive_transfer_args(p):
+    p.add_argument('--retries', type=int, default=0,
+                   help='遇到 429 / 5xx 時以 exponential backoff 重試的次數 (default: 0)')
+    p.add_argument('--chunk-size', type=float, default=None,
+                   help='(Optional) 分段傳輸大小（MB）；上傳時改用 resumable upload')
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    建立所有子指令的 parser。每個葉節點都以 set_defaults 指定
+    handler（實際執行的函式）與 module（handler 會載入的模組，供 --import-only 使用）。
+    預設路徑（ICONS_DIR 等）以 None 表示，交給各模組自己的常數。
+    """
+    parser = argparse.ArgumentParser(prog='cli.py', description="ShopBack screenshot automation")
+    parser.add_argument('--import-only', action='store_true',
+                        help='只載入子指令需要的模組後結束（給 bench_importtime.py 量測用）')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    # capture
+    p_capture = sub.add_parser('capture', help='截圖')
+    capture = p_capture.add_subparsers(dest='target', required=True)
+
+    p = capture.add_parser('banners', help='首頁輪播 banner 截圖')
+    _add_login_args(p)
+    p.add_argument('--metrics', action='store_true', help='收集瀏覽器效能數據並寫入 .metrics.json')
+    p.add_argument('--all-carousels', action='store_true',
+                   help='同一次頁面載入中並行截取所有輪播（首頁大輪播以外的存到 banners/carousel_<i>/）')
+    p.add_argument('--carousel-selector', default='.carousel-container', help='輪播 container 的 CSS selector')
+    p.add_argument('--backend', choices=['screenshot', 'screencast'], default='screenshot',
+                   help='screenshot：每次切換呼叫 page.screenshot；screencast：CDP 持續推送畫面，取切換完成當下那張')
+    p.add_argument('--screencast-format', choices=['png', 'jpeg'], default='png', help='screencast 畫面格式')
+    p.set_defaults(handler=_capture_banners, module='banner_screenshot')
+
+    p = capture.add_parser('fullpage', help='用 Playwright 截取整頁並自動滾動 (full-page screenshot)')
+    p.add_argument('-a', '--account', help='ShopBack login email')
+    p.add_argument('-p', '--password', help='ShopBack login password')
+    p.add_argument('-u', '--url', help='要截圖的頁面 URL')
+    p.add_argument('-n', '--output_name', help='自訂輸出檔名前綴 (會套入 yyyy_mmdd_... page_Travel.png)')
+    p.add_argument('--jobs', default=None, help='工作清單 JSON（[{"url", "name"}]），取代 -u / -n 一次截多頁')
+    p.add_argument('--shard', default=None, help='只處理工作清單中的第 i 份，格式 i/N（i 從 1 開始）')
+    p.add_argument('--manifest', default=None, help='(Optional) 此 shard 的結果 manifest 輸出路徑')
+    p.add_argument('--output-dir', default=None, help='(Optional) 截圖輸出資料夾，僅 --jobs 模式')
+    p.add_argument('--no-login', action='store_true', help='不登入，僅 --jobs 模式（本機 fixture 站台測試用）')
+    p.add_argument('--store-dir', default=None, help='(Optional) artifact store 位置，僅 --jobs 模式（本機測試請指向暫存資料夾）')
+    _add_profile_args(p)
+    p.add_argument('--metrics', action='store_true', help='收集瀏覽器效能數據並寫入 .metrics.json')
+    p.set_defaults(handler=_capture_fullpage, module='full_page_screenshot', check=partial(_check_capture_fullpage, p))
+
+    p = capture.add_parser('section', help='「旅費通通變回饋」區塊截圖')
+    _add_login_args(p)
+    p.add_argument('--metrics', action='store_true', help='收集瀏覽器效能數據並寫入 .metrics.json')
+    p.set_defaults(handler=_capture_section, module='rewards_section_screenshot')
+
+    p = sub.add_parser('login', help='登入並更新 state.json')
+    _add_login_args(p)
+    p.set_defaults(handler=_login, module='login')
+
+    # match
+    p = sub.add_parser('match', help='比對 icon 並重新命名 banner')
+    p.add_argument('--matcher', choices=['exhaustive', 'index'], default='exhaustive',
+                   help='exhaustive：每個 icon 都跑 matchTemplate；index：描述子索引取候選後再驗證')
+    p.add_argument('--top-k', type=int, default=None, help='index 模式下每張 banner 驗證的候選數量')
+    p.set_defaults(handler=_match, module='rename_banner')
+
+    # crop
+    p = sub.add_parser('crop', help='裁切單張 banner 圖片的 icon 並輸出')
+    p.add_argument('input_image', help='待裁切的大圖檔案路徑')
+    p.add_argument('--crop-x', type=int, default=165, help='裁切框 X 起始座標 (default: 165)')
+    p.add_argument('--crop-y', type=int, default=185, help='裁切框 Y 起始座標 (default: 185)')
+    p.add_argument('--crop-w', type=int, default=170, help='裁切框寬度 (default: 170)')
+    p.add_argument('--crop-h', type=int, default=56,  help='裁切框高度 (default: 56)')
+    p.set_defaults(handler=_crop, module='crop_icon')
+
+    # index
+    p = sub.add_parser('index', help='建立 icon 描述子索引，並可與 exhaustive matcher 比較')
+    p.add_argument('--icons-dir', default=None, help='icon 資料夾')
+    p.add_argument('--banners-dir', default=None, help='評估用 banner 資料夾')
+    p.add_argument('--index-file', default=None, help='索引檔路徑')
+    p.add_argument('--top-k', type=int, default=None, help='每張 banner 驗證的候選數量')
+    p.add_argument('--threshold', type=float, default=0.95, help='matchTemplate 相似度門檻')
+    p.add_argument('--evaluate', action='store_true', help='與 exhaustive matcher 比較 precision / recall')
+    p.add_argument('--report', default=None, help='(Optional) 評估結果輸出 JSON 路徑')
+    p.set_defaults(handler=_index, module='icon_index')
+
+    # drive
+    p_drive = sub.add_parser('drive', help='Google Drive 上傳 / 下載')
+    drive = p_drive.add_subparsers(dest='drive_command', required=True)
+
+    p = drive.add_parser('upload', help='Upload a file or all images in a folder to Google Drive')
+    _add_drive_auth_args(p)
+    p.add_argument('-l', '--local-path', dest='local_path', required=True,
+                   help='Local file or folder path to upload')
+    p.add_argument('-f', '--drive-folder-id', dest='drive_folder_id', default=None,
+                   help='Google Drive folder ID to upload into')
+    p.add_argument('--shard', default=None, help='只上傳依檔名分到第 i 份的檔案，格式 i/N')
+    p.add_argument('--manifest', default=None, help='(Optional) 此 shard 的結果 manifest 輸出路徑')
+    _add_drive_transfer_args(p)
+    p.set_defaults(handler=_drive_upload, module='upload_google_drive')
+
+    p = drive.add_parser('download', help='List (and optionally download) all files in a Google Drive folder')
+    _add_drive_auth_args(p)
+    p.add_argument('-f', '--folder-id', required=True,
+                   help="Google Drive Folder ID to list files from")
+    p.add_argument('-d', '--download-to', default=None,
+                   help="(Optional) Local folder to download all files into")
+    _add_drive_transfer_args(p)
+    p.set_defaults(handler=_drive_download, module='download_google_drive')
+
+    # shard
+    p_shard = sub.add_parser('shard', help='合併並檢查各 shard 的 manifest')
+    shard = p_shard.add_subparsers(dest='shard_command', required=True)
+    p = shard.add_parser('merge', help='合併 manifest，有漏掉、重複或失敗的目標時回傳 1')
+    p.add_argument('manifests', nargs='+', help='各 shard 的 manifest JSON')
+    p.add_argument('--jobs', default=None, help='(Optional) 完整工作清單，用來檢查是否有目標沒被任何 shard 處理')
+    p.add_argument('--output', default=None, help='(Optional) 合併結果輸出 JSON 路徑')
+    p.set_defaults(handler=_shard_merge, module='sharding')
+
+    # store
+    p_store = sub.add_parser('store', help='查詢本機 artifact store')
+    _add_store_dir_arg(p_store)
+    p_store.set_defaults(handler=_store, module='artifact_store')
+    store = p_store.add_subparsers(dest='store_command', required=True)
+    p = store.add_parser('first-seen', help='查詢品牌 / 目標 / hash 第一次出現的時間')
+    p.add_argument('--brand')
+    p.add_argument('--target')
+    p.add_argument('--hash', dest='digest')
+    p = store.add_parser('history', help='列出最近的產出紀錄')
+    p.add_argument('--brand')
+    p.add_argument('--target')
+    p.add_argument('--limit', type=int, default=50)
+    p = store.add_parser('pending', help='列出尚未上傳的產出')
+    p.add_argument('--kind')
+    p = store.add_parser('prune', help='移除已上傳且過期的 object 檔案')
+    p.add_argument('--days', type=float, default=None, help='保留天數（預設 RETENTION_DAYS）')
+    # --store-dir 放在 store 之後或子指令之後都可以；子指令沒給時不覆蓋 store 層的值
+    for p in store.choices.values():
+        _add_store_dir_arg(p, default=argparse.SUPPRESS)
+
+    return parser
+
+
+def _fill_default_paths(args) -> None:
+    """把 None 的參數換成模組內的預設常數（模組此時已載入）"""
+    module = sys.modules.get(args.module)
+    for attr, const in (('icons_dir', 'ICONS_DIR'), ('banners_dir', 'BANNERS_DIR'),
+                        ('index_file', 'INDEX_FILE'), ('store_dir', 'STORE_DIR'),
+                        ('top_k', 'TOP_K'), ('output_dir', 'OUTPUT_DIR'), ('days', 'RETENTION_DAYS')):
+        if getattr(args, attr, '') is None:
+            setattr(args, attr, getattr(module, const))
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    # 有些子指令的參數限制無法只用 add_argument 表達，由 check 在 parse 後補檢查
+    if getattr(args, 'check', None):
+        args.check(args)
+    importlib.import_module(args.module)
+    if args.import_only:
+        return 0
+    _fill_default_paths(args)
+    return args.handler(args) or 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
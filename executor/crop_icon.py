@@ -1,34 +1,152 @@
 import os
-import argparse
-from PIL import Image
+import json
+import sys
+from artifact_store import STORE_DIR, ArtifactStore, file_hash, release
 
 # 這支腳本用來裁切單張大圖中的 icon
 # 圖片路徑由參數輸入，其餘裁切參數作為常數定義
+# 另提供 crop_unknown_icons() 給 rename_banner.py 於同一個 process 內批次呼叫
 
 # === 常數設定 ===
 # 取得這支 script 的資料夾
 script_dir = os.path.dirname(os.path.abspath(__file__))
 DST_DIR    = os.path.join(script_dir, '..', 'unknow_icons')  # 裁切後 icon 存放資料夾
+# 歷次已上傳過的未知 icon 雜湊（跨天去重用）
+HASHES_FILE = os.path.join(script_dir, '..', 'unknown_icon_hashes.json')
+# 未知 icon 在 artifact store 中的 kind，上傳狀態由此對照
+ICON_KIND = 'unknow_icons'
 
-# 建立輸出資料夾（若不存在）
-os.makedirs(DST_DIR, exist_ok=True)
+# 預設裁切框 (x, y, w, h)
+CROP_BOX = (165, 185, 170, 56)
+# dHash 漢明距離門檻：小於等於此值視為同一個品牌
+HASH_DISTANCE = 6
 
-def main():
-    parser = argparse.ArgumentParser(
-        description='裁切單張 banner 圖片的 icon 並輸出'
-    )
-    parser.add_argument(
-        'input_image',
-        help='待裁切的大圖檔案路徑'
-    )
-    parser.add_argument('--crop-x', type=int, default=165, help='裁切框 X 起始座標 (default: 165)')
-    parser.add_argument('--crop-y', type=int, default=185, help='裁切框 Y 起始座標 (default: 185)')
-    parser.add_argument('--crop-w', type=int, default=170, help='裁切框寬度 (default: 170)')
-    parser.add_argument('--crop-h', type=int, default=56,  help='裁切框高度 (default: 56)')
 
-    args = parser.parse_args()
+def dhash(arr, hash_size: int = 8) -> int:
+    """
+    計算 difference hash（感知雜湊），輸入為已解碼的 numpy 陣列（BGR 或灰階）
+    """
+    import cv2
+    gray = cv2.cvtColor(arr, cv2.COLOR_BGR2GRAY) if arr.ndim == 3 else arr
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    diff = small[:, 1:] > small[:, :-1]
+    value = 0
+    for bit in diff.flatten():
+        value = (value << 1) | int(bit)
+    return value
 
-    input_path = args.input_image
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+
+def crop_array(arr, box: tuple[int, int, int, int] = CROP_BOX):
+    """從已解碼的陣列裁切 icon，box 為 (x, y, w, h)"""
+    x, y, w, h = box
+    return arr[y:y + h, x:x + w]
+
+
+def load_known_hashes(path: str = HASHES_FILE, store_dir: str = STORE_DIR) -> list[int]:
+    """
+    讀取已上傳過的 icon 雜湊。上次 run 輸出但還沒確認上傳的項目（pending）在這裡對照 artifact store：
+    已上傳的轉為已知，沒上傳成功的丟掉，這次會再輸出一次。
+    """
+    if not os.path.exists(path):
+        return []
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except Exception as e:
+        print(f"[WARN] 無法讀取 icon 雜湊紀錄：{path}, {e}")
+        return []
+    # 舊格式是單純的雜湊清單，視為都已上傳
+    if isinstance(data, list):
+        data = {'uploaded': data, 'pending': []}
+
+    known = [int(h, 16) for h in data.get('uploaded', [])]
+    pending = data.get('pending', [])
+    if pending:
+        store = ArtifactStore(store_dir)
+        done = {(row['name'], row['hash']) for row in store.uploaded(ICON_KIND)}
+        store.close()
+        for p in pending:
+            if (p['name'], p['sha256']) in done:
+                known.append(int(p['hash'], 16))
+            else:
+                print(f"[INFO] 上次輸出的 icon 未上傳成功，這次重新輸出：{p['name']}")
+    return known
+
+
+def save_known_hashes(hashes: list[int], path: str = HASHES_FILE, pending: list[dict] = ()) -> None:
+    """hashes 為已確認上傳的雜湊；pending 為這次剛輸出的 icon，下次讀取時才依上傳結果確認"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'uploaded': [f"{h:016x}" for h in hashes], 'pending': list(pending)}, f, indent=2)
+
+
+def crop_unknown_icons(
+    banners: list[tuple[str, object]],
+    *,
+    box: tuple[int, int, int, int] = CROP_BOX,
+    max_distance: int = HASH_DISTANCE,
+    dst_dir: str = DST_DIR,
+    hashes_file: str | None = HASHES_FILE,
+    store_dir: str = STORE_DIR,
+) -> list[dict]:
+    """
+    批次裁切未匹配 banner 的 icon，並依 dHash 分群。
+    banners 為 [(檔名, BGR 陣列), ...]；每一群只輸出一張代表圖，
+    檔名為 <第一張 banner>_icon_x<出現次數>.png。
+    若 hashes_file 中已有相近雜湊（之前的 run 已輸出並上傳過），該群只計數不再輸出；
+    這次輸出的 icon 先記為 pending，等 store 記錄到上傳成功後才算已知。
+
+    回傳每一群的資訊：{'name', 'hash', 'count', 'sources', 'path', 'seen'}
+    """
+    import cv2
+
+    known = load_known_hashes(hashes_file, store_dir) if hashes_file else []
+    pending = []
+
+    clusters = []
+    for name, arr in banners:
+        icon = crop_array(arr, box)
+        if icon.size == 0:
+            print(f"[WARN] 裁切範圍超出圖片：{name}")
+            continue
+        h = dhash(icon)
+        for c in clusters:
+            if hamming(c['hash'], h) <= max_distance:
+                c['count'] += 1
+                c['sources'].append(name)
+                break
+        else:
+            clusters.append({'name': name, 'hash': h, 'count': 1, 'sources': [name], 'icon': icon})
+
+    os.makedirs(dst_dir, exist_ok=True)
+    for c in clusters:
+        icon = c.pop('icon')
+        c['path'] = None
+        c['seen'] = any(hamming(k, c['hash']) <= max_distance for k in known)
+        if c['seen']:
+            print(f"[SKIP] 先前已輸出過相同 icon：{c['name']}（{c['count']} 次）")
+            continue
+        base, _ = os.path.splitext(os.path.basename(c['name']))
+        new_name = f"{base}_icon_x{c['count']}.png"
+        release(os.path.join(dst_dir, new_name))
+        if cv2.imwrite(os.path.join(dst_dir, new_name), icon):
+            c['path'] = os.path.join(dst_dir, new_name)
+            pending.append({'hash': f"{c['hash']:016x}", 'name': new_name, 'sha256': file_hash(c['path'])})
+            print(f"[OK] 已裁切並儲存：{new_name}（{c['count']} 次：{', '.join(c['sources'])}）")
+        else:
+            print(f"[ERROR] 無法儲存裁切檔案：{new_name}")
+
+    if hashes_file:
+        save_known_hashes(known, hashes_file, pending)
+    return clusters
+
+
+def crop_single(input_path: str, box: tuple[int, int, int, int] = CROP_BOX) -> None:
+    """裁切單張圖片的 icon 並輸出到 DST_DIR，box 為 (x, y, w, h)"""
+    from PIL import Image
 
     # 打開圖片並裁切
     try:
@@ -37,19 +155,25 @@ def main():
         print(f"[ERROR] 無法開啟圖片：{input_path}, {e}")
         return
 
-    box = (args.crop_x, args.crop_y, args.crop_x + args.crop_w, args.crop_y + args.crop_h)
-    cropped = img.crop(box)
+    x, y, w, h = box
+    cropped = img.crop((x, y, x + w, y + h))
 
     # 輸出檔名加上 _icon
     base, ext = os.path.splitext(os.path.basename(input_path))
     new_name = f"{base}_icon{ext}"
     dst_path = os.path.join(DST_DIR, new_name)
 
+    # 建立輸出資料夾（若不存在）
+    os.makedirs(DST_DIR, exist_ok=True)
+
     try:
+        release(dst_path)
         cropped.save(dst_path)
         print(f"[OK] 已裁切並儲存：{new_name}")
     except Exception as e:
         print(f"[ERROR] 無法儲存裁切檔案：{new_name}, {e}")
 
 if __name__ == '__main__':
-    main()
+    # 參數解析統一在 cli.py
+    from cli import main
+    sys.exit(main(['crop', *sys.argv[1:]]))
@@ -1,12 +1,10 @@
 #!/usr/bin/env python3
 import os
 import io
-import argparse
+import sys
 import json
 import base64
 from google.auth.transport.requests import Request
-from google.oauth2 import service_account
-from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
 from googleapiclient.http import MediaIoBaseDownload
 
@@ -32,6 +30,8 @@ def authenticate_oauth_from_json(credentials_json_str):
             print("[Auth] 嘗試使用 refresh token 更新")
             creds.refresh(Request())
         else:
+            # 互動式授權只在沒有可用 token 時需要，延後載入 google_auth_oauthlib
+            from google_auth_oauthlib.flow import InstalledAppFlow
             client_config = json.loads(credentials_json_str)
             flow = InstalledAppFlow.from_client_config(client_config, SCOPES)
             creds = flow.run_local_server(port=0)
@@ -47,13 +47,14 @@ def authenticate_oauth_from_json(credentials_json_str):
 def authenticate_service_account_from_json(sa_key_json_str):
     """使用服務帳號金鑰 JSON 字串"""
     print("[Auth] 使用 Service Account 認證")
+    from google.oauth2 import service_account
     key_info = json.loads(sa_key_json_str)
     creds = service_account.Credentials.from_service_account_info(
         key_info, scopes=SCOPES)
     return creds
 
 
-def list_folder_files(drive, folder_id):
+def list_folder_files(drive, folder_id, num_retries=0):
     """列出指定資料夾下所有未刪除檔案（不遞迴）"""
     print(f"[List] 取得資料夾內容：{folder_id}")
     query = f"'{folder_id}' in parents and trashed=false"
@@ -65,7 +66,7 @@ def list_folder_files(drive, folder_id):
             spaces='drive',
             fields='nextPageToken, files(id, name, mimeType)',
             pageToken=page_token
-        ).execute()
+        ).execute(num_retries=num_retries)
         files.extend(resp.get('files', []))
         page_token = resp.get('nextPageToken', None)
         if not page_token:
@@ -74,23 +75,31 @@ def list_folder_files(drive, folder_id):
     return files
 
 
-def download_file(drive, file_id, file_name, dest_folder):
-    """下載單一檔案到本地資料夾"""
+def download_file(drive, file_id, file_name, dest_folder, num_retries=0, chunksize=None):
+    """
+    下載單一檔案到本地資料夾，成功時回傳本地路徑、失敗回傳 None。
+    num_retries：遇到 429 / 5xx 時重試次數；chunksize（bytes）：每次 Range 請求的大小
+    """
     try:
         print(f"[Download] 準備下載：{file_name} (ID: {file_id})")
         request = drive.files().get_media(fileId=file_id)
         local_path = os.path.join(dest_folder, file_name)
         fh = io.FileIO(local_path, 'wb')
-        downloader = MediaIoBaseDownload(fh, request)
+        if chunksize:
+            downloader = MediaIoBaseDownload(fh, request, chunksize=chunksize)
+        else:
+            downloader = MediaIoBaseDownload(fh, request)
         done = False
         while not done:
-            status, done = downloader.next_chunk()
+            status, done = downloader.next_chunk(num_retries=num_retries)
             if status:
                 print(f"  └▶ {file_name}: {int(status.progress() * 100)}%")
         fh.close()
         print(f"[Download] ✅ 已完成下載：{file_name}")
+        return local_path
     except Exception as e:
         print(f"[Download] ❌ 下載失敗：{file_name}\n錯誤：{e}")
+        return None
 
 
 def main(args):
@@ -124,7 +133,7 @@ def main(args):
         return
 
     # 列出資料夾內容
-    files = list_folder_files(drive, args.folder_id)
+    files = list_folder_files(drive, args.folder_id, num_retries=args.retries)
     for f in files:
         print(f" • {f['name']} ({f['mimeType']}) ← ID: {f['id']}")
 
@@ -134,22 +143,12 @@ def main(args):
         os.makedirs(args.download_to, exist_ok=True)
         for f in files:
             if f['mimeType'] != 'application/vnd.google-apps.folder':
-                download_file(drive, f['id'], f['name'], args.download_to)
+                download_file(drive, f['id'], f['name'], args.download_to, num_retries=args.retries,
+                              chunksize=int(args.chunk_size * 1024 * 1024) if args.chunk_size else None)
         print("[Main] 所有檔案處理完成")
 
 
 if __name__ == '__main__':
-    p = argparse.ArgumentParser(
-        description="List (and optionally download) all files in a Google Drive folder using JSON credentials.")
-    p.add_argument('-j', '--credentials-json', required=True,
-                   help="OAuth2 or service account JSON string")
-    p.add_argument('-f', '--folder-id', required=True,
-                   help="Google Drive Folder ID to list files from")
-    p.add_argument('-d', '--download-to', default=None,
-                   help="(Optional) Local folder to download all files into")
-    p.add_argument('--service-account', action='store_true',
-                   help="Interpret credentials JSON as a service account key")
-    p.add_argument('--token-base64', default=None,
-                   help="(Optional) Base64-encoded token.pickle content")
-    args = p.parse_args()
-    main(args)
+    # 參數解析統一在 cli.py
+    from cli import main
+    sys.exit(main(['drive', 'download', *sys.argv[1:]]))
@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+import os
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from itertools import count
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# 本機假的 Google Drive v3 API，只實作 upload / download_google_drive.py 用到的部分：
+#   - files.list（q 中的 '<id>' in parents、pageSize / pageToken 分頁）
+#   - files.create（uploadType=media / multipart / resumable）
+#   - files.get（metadata 與 alt=media，支援 Range）
+#   - files.update（metadata PATCH 與 media PATCH）
+# 可設定每個請求的延遲、頻寬上限，以及隨機回傳 429 / 5xx，讓 bench_drive.py 量測重試與吞吐量。
+# googleapiclient 端以 discovery_document(base_url) 建 client 指向這裡，不需要憑證。
+
+DEFAULT_PAGE_SIZE = 100
+FOLDER_MIME = 'application/vnd.google-apps.folder'
+
+
+class FakeDrive:
+    """伺服器狀態與設定；handler 透過 server.drive 存取"""
+
+    def __init__(self, latency: float = 0.0, bandwidth: float = 0.0, error_rate: float = 0.0,
+                 error_codes: tuple[int, ...] = (429, 500, 503), seed: int | None = None):
+        self.latency = latency          # 每個請求額外延遲（秒）
+        self.bandwidth = bandwidth      # 每個連線的頻寬上限（bytes/s），0 表示不限
+        self.error_rate = error_rate    # 隨機回傳錯誤的機率
+        self.error_codes = error_codes
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.files: dict[str, dict] = {}
+        self.uploads: dict[str, dict] = {}
+        self._ids = count(1)
+        self.reset_stats()
+
+    def reset_stats(self) -> None:
+        with self.lock:
+            self.stats = {'requests': 0, 'injected_errors': 0, 'bytes_in': 0, 'bytes_out': 0, 'by_op': {}}
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return json.loads(json.dumps(self.stats))
+
+    def new_id(self, prefix: str) -> str:
+        with self.lock:
+            return f"{prefix}{next(self._ids):06d}"
+
+    def count(self, op: str, bytes_in: int) -> None:
+        with self.lock:
+            self.stats['requests'] += 1
+            self.stats['bytes_in'] += bytes_in
+            self.stats['by_op'][op] = self.stats['by_op'].get(op, 0) + 1
+
+    def should_fail(self) -> int | None:
+        with self.lock:
+            if self.error_rate and self.random.random() < self.error_rate:
+                self.stats['injected_errors'] += 1
+                return self.random.choice(self.error_codes)
+        return None
+
+    def add_file(self, name: str, data: bytes, parents: list[str] | None = None,
+                 mime_type: str = 'application/octet-stream') -> dict:
+        meta = {'id': self.new_id('file'), 'name': name, 'mimeType': mime_type,
+                'parents': parents or [], 'data': data}
+        with self.lock:
+            self.files[meta['id']] = meta
+        return meta
+
+
+def public(meta: dict) -> dict:
+    out = {k: v for k, v in meta.items() if k != 'data'}
+    out['size'] = str(len(meta['data']))
+    out['kind'] = 'drive#file'
+    return out
+
+
+def parse_multipart(body: bytes, content_type: str) -> tuple[dict, bytes, str]:
+    """multipart/related → (metadata, media bytes, media mime type)"""
+    boundary = re.search(r'boundary="?([^";]+)"?', content_type).group(1).encode()
+    parts = []
+    for chunk in body.split(b'--' + boundary)[1:]:
+        if chunk.startswith(b'--'):
+            break
+        # googleapiclient 以 \n 換行，其他 client 可能用 \r\n；以 boundary 後的換行判斷，不能看內容結尾
+        newline = b'\r\n' if chunk.startswith(b'\r\n') else b'\n'
+        head, payload = chunk[len(newline):].split(newline * 2, 1)
+        # 每個 part 結尾到下一個 boundary 之間有一個換行
+        payload = payload[:-len(newline)]
+        mime = re.search(rb'(?i)content-type:\s*([^\r\n;]+)', head)
+        parts.append((mime.group(1).decode() if mime else 'application/octet-stream', payload))
+    (_, meta_bytes), (media_mime, media) = parts[0], parts[1]
+    return json.loads(meta_bytes or b'{}'), media, media_mime
+
+
+class DriveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # header 與 body 分兩次寫出，不關 Nagle 會與 client 的 delayed ACK 疊出每個請求約 40ms 的延遲
+    disable_nagle_algorithm = True
+    # body 比 Content-Length 短時不要永遠等下去，與真正的伺服器一樣逾時斷線
+    timeout = 30
+
+    @property
+    def drive(self) -> FakeDrive:
+        return self.server.drive
+
+    def log_message(self, format, *args):
+        pass
+
+    # --- 傳輸 ---
+
+    def _throttle(self, size: int) -> None:
+        if self.drive.bandwidth and size:
+            time.sleep(size / self.drive.bandwidth)
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        self._throttle(len(body))
+        return body
+
+    def _send(self, status: int, body: bytes = b'', content_type: str = 'application/json',
+              headers: dict | None = None) -> None:
+        self._throttle(len(body))
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        with self.drive.lock:
+            self.drive.stats['bytes_out'] += len(body)
+        if body:
+            self.wfile.write(body)
+
+    def _json(self, status: int, obj: dict, headers: dict | None = None) -> None:
+        self._send(status, json.dumps(obj).encode(), headers=headers)
+
+    def _error(self, status: int, message: str, reason: str = 'backendError') -> None:
+        self._json(status, {'error': {'code': status, 'message': message,
+                                      'errors': [{'reason': reason, 'message': message}]}})
+
+    # --- 路由 ---
+
+    def _dispatch(self, method: str) -> None:
+        url = urlsplit(self.path)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        body = self._read_body()
+        op, handler, args = self._route(method, url.path, query)
+        self.drive.count(op, len(body))
+        if self.drive.latency:
+            time.sleep(self.drive.latency)
+        if handler is None:
+            return self._error(404, f"not found: {method} {url.path}", 'notFound')
+        # 先讀完 body 再注入錯誤，連線才能繼續重用
+        status = self.drive.should_fail()
+        if status:
+            reason = 'rateLimitExceeded' if status == 429 else 'backendError'
+            return self._error(status, f"injected {status}", reason)
+        handler(query, body, *args)
+
+    def _route(self, method: str, path: str, query: dict):
+        m = re.fullmatch(r'/drive/v3/files(?:/([^/]+))?', path)
+        if m:
+            file_id = m.group(1)
+            if method == 'GET' and file_id is None:
+                return 'files.list', self._list, ()
+            if method == 'GET' and query.get('alt') == 'media':
+                return 'files.get_media', self._get_media, (file_id,)
+            if method == 'GET':
+                return 'files.get', self._get, (file_id,)
+            if method == 'PATCH':
+                return 'files.update', self._update, (file_id,)
+            if method == 'POST' and file_id is None:
+                return 'files.create', self._create, (None,)
+        m = re.fullmatch(r'/(?:resumable/)?upload/drive/v3/files(?:/([^/]+))?', path)
+        if m:
+            file_id = m.group(1)
+            op = 'files.update' if file_id else 'files.create'
+            if method == 'PUT' and 'upload_id' in query:
+                return f"{op}.chunk", self._resumable_chunk, (query['upload_id'],)
+            if method in ('POST', 'PATCH'):
+                return f"{op}.{query.get('uploadType', 'media')}", self._upload, (file_id,)
+        return 'unknown', None, ()
+
+    do_GET = lambda self: self._dispatch('GET')
+    do_POST = lambda self: self._dispatch('POST')
+    do_PUT = lambda self: self._dispatch('PUT')
+    do_PATCH = lambda self: self._dispatch('PATCH')
+
+    # --- files.list / get ---
+
+    def _list(self, query: dict, body: bytes) -> None:
+        files = sorted(self.drive.files.values(), key=lambda f: f['id'])
+        q = query.get('q', '')
+        parent = re.search(r"'([^']+)' in parents", q)
+        if parent:
+            files = [f for f in files if parent.group(1) in f['parents']]
+        size = int(query.get('pageSize') or DEFAULT_PAGE_SIZE)
+        start = int(query.get('pageToken') or 0)
+        page = files[start:start + size]
+        resp = {'kind': 'drive#fileList', 'files': [public(f) for f in page]}
+        if start + size < len(files):
+            resp['nextPageToken'] = str(start + size)
+        self._json(200, resp)
+
+    def _get(self, query: dict, body: bytes, file_id: str) -> None:
+        meta = self.drive.files.get(file_id)
+        if meta is None:
+            return self._error(404, f"File not found: {file_id}", 'notFound')
+        self._json(200, public(meta))
+
+    def _get_media(self, query: dict, body: bytes, file_id: str) -> None:
+        meta = self.drive.files.get(file_id)
+        if meta is None:
+            return self._error(404, f"File not found: {file_id}", 'notFound')
+        data = meta['data']
+        rng = re.fullmatch(r'bytes=(\d+)-(\d*)', self.headers.get('Range', ''))
+        if not rng:
+            return self._send(200, data, meta['mimeType'])
+        start = int(rng.group(1))
+        if start >= len(data):
+            return self._send(416, b'', headers={'Content-Range': f"bytes */{len(data)}"})
+        end = min(int(rng.group(2)) if rng.group(2) else len(data) - 1, len(data) - 1)
+        self._send(206, data[start:end + 1], meta['mimeType'],
+                   headers={'Content-Range': f"bytes {start}-{end}/{len(data)}"})
+
+    # --- files.create / update ---
+
+    def _update(self, query: dict, body: bytes, file_id: str) -> None:
+        meta = self.drive.files.get(file_id)
+        if meta is None:
+            return self._error(404, f"File not found: {file_id}", 'notFound')
+        self._apply(meta, json.loads(body or b'{}'), query)
+        self._json(200, public(meta))
+
+    def _create(self, query: dict, body: bytes, file_id: None) -> None:
+        # 只有 metadata 的 files.create（例如建立資料夾）
+        changes = json.loads(body or b'{}')
+        meta = self._save(None, changes, b'', changes.get('mimeType', FOLDER_MIME), query)
+        self._json(200, public(meta))
+
+    def _apply(self, meta: dict, changes: dict, query: dict) -> None:
+        for key in ('name', 'mimeType'):
+            if key in changes:
+                meta[key] = changes[key]
+        if 'parents' in changes:
+            meta['parents'] = list(changes['parents'])
+        if query.get('addParents'):
+            meta['parents'] += query['addParents'].split(',')
+        if query.get('removeParents'):
+            meta['parents'] = [p for p in meta['parents'] if p not in query['removeParents'].split(',')]
+
+    def _save(self, file_id: str | None, changes: dict, data: bytes, mime_type: str, query: dict) -> dict:
+        if file_id is None:
+            meta = self.drive.add_file(changes.get('name', 'Untitled'), data, changes.get('parents'),
+                                       changes.get('mimeType', mime_type))
+        else:
+            meta = self.drive.files.get(file_id)
+            if meta is None:
+                return None
+            meta['data'] = data
+        self._apply(meta, changes, query)
+        return meta
+
+    def _upload(self, query: dict, body: bytes, file_id: str | None) -> None:
+        upload_type = query.get('uploadType', 'media')
+        content_type = self.headers.get('Content-Type', 'application/octet-stream')
+        if upload_type == 'resumable':
+            # 第一個請求只帶 metadata，回傳之後 PUT 內容的 session URI
+            upload_id = self.drive.new_id('upload')
+            self.drive.uploads[upload_id] = {
+                'file_id': file_id, 'query': query, 'buf': bytearray(),
+                'meta': json.loads(body or b'{}'),
+                'mime': self.headers.get('X-Upload-Content-Type', 'application/octet-stream'),
+            }
+            host = self.headers.get('Host')
+            path = urlsplit(self.path).path
+            return self._send(200, b'', headers={'Location': f"http://{host}{path}?uploadType=resumable&upload_id={upload_id}"})
+        if upload_type == 'multipart':
+            changes, data, mime = parse_multipart(body, content_type)
+        elif upload_type == 'media':
+            changes, data, mime = {}, body, content_type
+        else:
+            return self._error(400, f"unsupported uploadType: {upload_type}", 'badRequest')
+        meta = self._save(file_id, changes, data, mime, query)
+        if meta is None:
+            return self._error(404, f"File not found: {file_id}", 'notFound')
+        self._json(200, public(meta))
+
+    def _resumable_chunk(self, query: dict, body: bytes, upload_id: str) -> None:
+        session = self.drive.uploads.get(upload_id)
+        if session is None:
+            return self._error(404, f"upload session not found: {upload_id}", 'notFound')
+        rng = re.fullmatch(r'bytes (?:(\d+)-(\d+)|\*)/(\d+|\*)', self.headers.get('Content-Range', 'bytes */*'))
+        if rng is None:
+            return self._error(400, "invalid Content-Range", 'badRequest')
+        buf = session['buf']
+        if rng.group(1) is not None:
+            start = int(rng.group(1))
+            if start != len(buf):
+                # 與已收到的位置不符（例如重試），回報目前進度讓 client 從正確位置續傳
+                return self._resume_incomplete(buf)
+            buf.extend(body)
+        total = rng.group(3)
+        if total != '*' and len(buf) >= int(total):
+            del self.drive.uploads[upload_id]
+            meta = self._save(session['file_id'], session['meta'], bytes(buf), session['mime'], session['query'])
+            return self._json(200, public(meta))
+        self._resume_incomplete(buf)
+
+    def _resume_incomplete(self, buf: bytearray) -> None:
+        headers = {'Range': f"bytes=0-{len(buf) - 1}"} if buf else {}
+        self._send(308, b'', headers=headers)
+
+
+def start_server(drive: FakeDrive, host: str = '127.0.0.1', port: int = 0) -> ThreadingHTTPServer:
+    """在背景執行緒啟動伺服器；base URL 為 f"http://{host}:{server.server_address[1]}/" """
+    server = ThreadingHTTPServer((host, port), DriveHandler)
+    server.daemon_threads = True
+    server.drive = drive
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def discovery_document(base_url: str) -> dict:
+    """googleapiclient 內建的 Drive v3 discovery 文件，rootUrl 改指向假伺服器"""
+    import googleapiclient
+    path = os.path.join(os.path.dirname(googleapiclient.__file__), 'discovery_cache', 'documents', 'drive.v3.json')
+    with open(path, 'r', encoding='utf-8') as f:
+        doc = json.load(f)
+    doc['rootUrl'] = base_url
+    doc['baseUrl'] = base_url + doc['servicePath']
+    return doc
+
+
+def build_client(base_url: str):
+    """建立指向假伺服器的 Drive client（不帶憑證）"""
+    from googleapiclient.discovery import build_from_document
+    from googleapiclient.http import build_http
+    # build_http() 與 build() 相同：httplib2 不把 resumable upload 的 308 當成 redirect
+    return build_from_document(discovery_document(base_url), http=build_http())
+
+
+def main(args) -> int:
+    drive = FakeDrive(latency=args.latency / 1000, bandwidth=args.bandwidth * 1024 * 1024,
+                      error_rate=args.error_rate, seed=args.seed)
+    server = ThreadingHTTPServer((args.host, args.port), DriveHandler)
+    server.drive = drive
+    print(f"[FakeDrive] 監聽 http://{args.host}:{server.server_address[1]}/ "
+          f"latency={args.latency}ms bandwidth={args.bandwidth or '∞'}MB/s error_rate={args.error_rate}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(f"[FakeDrive] 統計：{json.dumps(drive.snapshot(), ensure_ascii=False)}")
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Local fake Google Drive v3 server for benchmarks")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help='每個請求的延遲（毫秒）')
+    parser.add_argument('--bandwidth', type=float, default=0.0, help='每個連線的頻寬上限（MB/s），0 表示不限')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='隨機回傳 429 / 5xx 的機率')
+    parser.add_argument('--seed', type=int, default=None, help='錯誤注入的亂數種子')
+    sys.exit(main(parser.parse_args()))
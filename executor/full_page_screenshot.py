@@ -1,82 +1,172 @@
 import os
-import time
-import argparse
+import sys
 import asyncio
 from datetime import datetime
 import pytz
-from playwright.async_api import async_playwright
-from login import launch_and_login, HOME_URL
+from playwright.async_api import async_playwright, Page
+from login import launch_and_login, launch_anonymous, HOME_URL
+from artifact_store import ArtifactStore, release, STORE_DIR
+from page_metrics import PageMetrics, write_metrics, write_run_report
+from readiness import track_network, wait_for_network_quiet, wait_until_ready
+from sharding import select_shard, write_manifest
 
 # 取得這支 script 的資料夾
 script_dir = os.path.dirname(os.path.abspath(__file__))
 # 圖片儲存資料夾
 OUTPUT_DIR = os.path.join(script_dir, '..', 'full_page_screenshot')
 
-async def capture_full_page_with_playwright(
-    email: str,
-    password: str,
-    url: str,
-    output_name: str,
-    scroll_pause: float = 2.0
-):
-    # 1. 產生日期字串 yyyy_mmdd
+def date_prefix() -> str:
     # 指定時區名稱（例：Asia/Taipei）
     tz = pytz.timezone("Asia/Taipei")
 
     # 取得現在時間（含指定時區）
     now = datetime.now(tz)
-    
+
     # 取得當前日期字串 (YYYY_MMDD)
-    date_str = now.strftime("%Y_%m%d")
-    
-    # 2. 組成檔名
-    filename = f"{date_str}_{output_name}.png"
+    return now.strftime("%Y_%m%d")
+
+
+async def capture_page(
+    page: Page,
+    url: str,
+    output_path: str,
+    label: str,
+    scroll_quiet_ms: int = 500,
+    scroll_timeout_ms: int = 5000,
+    collect_metrics: bool = False,
+    store_dir: str = STORE_DIR,
+) -> str | None:
+    """
+    在 page 上截取 url 的整頁圖到 output_path，並記錄到 store_dir 的 artifact store；
+    有收集 metrics 時回傳 metrics 檔路徑，由呼叫端在全部頁面完成後彙整成報告
+    """
+    # 前往指定網址
+    track_network(page)
+    metrics = PageMetrics(page) if collect_metrics else None
+    if metrics:
+        await metrics.start()
+    await page.goto(url)
+    await wait_until_ready(page, animations=False, label=label)
+
+    prev_height = await page.evaluate("() => document.body.scrollHeight")
+
+    while True:
+        await page.evaluate("() => window.scrollTo(0, document.body.scrollHeight)")
+        # 等 lazy-load 的請求結束即可，不必固定停頓
+        try:
+            await wait_for_network_quiet(page, scroll_quiet_ms, scroll_timeout_ms)
+        except asyncio.TimeoutError:
+            print(f"[Screenshot] 捲動後 {scroll_timeout_ms}ms 內網路未靜止，繼續下一步")
+        new_height = await page.evaluate("() => document.body.scrollHeight")
+        if new_height == prev_height:
+            break
+        prev_height = new_height
+
+    # 取得整個文件高度
+    total_height = await page.evaluate("() => Math.max(document.body.scrollHeight, document.documentElement.scrollHeight)")
+    # 設定 viewport 高度
+    await page.set_viewport_size({"width": 1920, "height": total_height})
+
+    readiness = await wait_until_ready(page, label=label)
+
+    # full_page=True 會自動把整頁延展到 screenshot
+    release(output_path)
+    await page.screenshot(path=output_path, full_page=True)
+    print(f"[Screenshot] 截圖存到 {output_path}。")
+    store = ArtifactStore(store_dir)
+    store.put(output_path, 'full_page_screenshot', target=url)
+    store.close()
+
+    if metrics:
+        metrics_path = write_metrics(output_path, await metrics.collect(), readiness=readiness)
+        await metrics.stop()
+        return metrics_path
+    return None
+
+
+async def capture_full_page_with_playwright(
+    email: str,
+    password: str,
+    url: str,
+    output_name: str,
+    scroll_quiet_ms: int = 500,
+    scroll_timeout_ms: int = 5000,
+    collect_metrics: bool = False,
+    persistent_profile: bool = False,
+):
+    # 1. 產生日期字串 yyyy_mmdd，組成檔名
+    filename = f"{date_prefix()}_{output_name}.png"
     output_path = f"{OUTPUT_DIR}/{filename}"
 
     async with async_playwright() as p:
-        page = await launch_and_login(email=email, password=password)
+        page = await launch_and_login(email=email, password=password, persistent=persistent_profile)
         print("[Screenshot] 登入完成，開始截圖流程。")
-        
-        # 前往指定網址
-        await page.goto(url)
-        await asyncio.sleep(scroll_pause)
-
-        prev_height = await page.evaluate("() => document.body.scrollHeight")
-
-        while True:
-            await page.evaluate("() => window.scrollTo(0, document.body.scrollHeight)")
-            await asyncio.sleep(scroll_pause)
-            new_height = await page.evaluate("() => document.body.scrollHeight")
-            if new_height == prev_height:
-                break
-            prev_height = new_height
-
-        # 取得整個文件高度
-        total_height = await page.evaluate("() => Math.max(document.body.scrollHeight, document.documentElement.scrollHeight)")
-        # 設定 viewport 高度
-        await page.set_viewport_size({"width": 1920, "height": total_height})
-        
-        await asyncio.sleep(2)
-
-        # full_page=True 會自動把整頁延展到 screenshot
-        await page.screenshot(path=output_path, full_page=True)
-        print("[Screenshot] 截圖存到 {output_path}。")
+
+        metrics_path = await capture_page(page, url, output_path, output_name,
+                                          scroll_quiet_ms, scroll_timeout_ms, collect_metrics)
+        if metrics_path:
+            write_run_report(OUTPUT_DIR, [metrics_path])
 
         await page.context.close()
 
+
+async def capture_full_page_jobs(
+    email: str | None,
+    password: str | None,
+    jobs: list[dict],
+    shard: str | None = None,
+    manifest_path: str | None = None,
+    output_dir: str = OUTPUT_DIR,
+    collect_metrics: bool = False,
+    persistent_profile: bool = False,
+    store_dir: str = STORE_DIR,
+) -> list[dict]:
+    """
+    一次登入後依序截取工作清單中屬於此 shard 的頁面。
+    jobs 為 [{"url": ..., "name": ...}]，以 name 作為分片與 manifest 的 key。
+    email 為 None 時不登入（本機 fixture 測試用）；這時應給 store_dir，避免寫進正式的 artifact store。
+    """
+    mine = select_shard(jobs, shard, key=lambda job: job['name'])
+    print(f"[Screenshot] shard {shard or '1/1'}：{len(mine)} / {len(jobs)} 個頁面")
+    os.makedirs(output_dir, exist_ok=True)
+    date_str = date_prefix()
+
+    results = []
+    metrics_paths = []
+    async with async_playwright() as p:
+        if email is None:
+            page = await launch_anonymous()
+        else:
+            page = await launch_and_login(email=email, password=password, persistent=persistent_profile)
+            print("[Screenshot] 登入完成，開始截圖流程。")
+        context = page.context
+
+        for job in mine:
+            output_path = os.path.join(output_dir, f"{date_str}_{job['name']}.png")
+            # 每個頁面用新的分頁，網路追蹤、metrics 與 viewport 都互不影響
+            job_page = await context.new_page()
+            try:
+                metrics_path = await capture_page(job_page, job['url'], output_path, job['name'],
+                                                  collect_metrics=collect_metrics, store_dir=store_dir)
+                if metrics_path:
+                    metrics_paths.append(metrics_path)
+                results.append({'key': job['name'], 'url': job['url'], 'status': 'ok', 'artifact': output_path})
+            except Exception as e:
+                print(f"[Screenshot] ❌ {job['name']} 截圖失敗：{e}")
+                results.append({'key': job['name'], 'url': job['url'], 'status': 'error', 'error': str(e)})
+            finally:
+                await job_page.close()
+
+        await context.close()
+
+    # 所有頁面完成後才彙整一次
+    if metrics_paths:
+        write_run_report(output_dir, metrics_paths)
+    if manifest_path:
+        write_manifest(manifest_path, shard, [job['name'] for job in mine], results)
+    return results
+
 if __name__ == "__main__":
-    parser = argparse.ArgumentParser(
-        description="用 Playwright 截取整頁並自動滾動 (full-page screenshot)"
-    )
-    parser.add_argument('-a', '--account', required=True, help='ShopBack login email')
-    parser.add_argument('-p', '--password', required=True, help='ShopBack login password')
-    parser.add_argument('-u', '--url', required=True, help='要截圖的頁面 URL')
-    parser.add_argument('-n', '--output_name', required=True, help='自訂輸出檔名前綴 (會套入 yyyy_mmdd_... page_Travel.png)')
-    args = parser.parse_args()
-    
-    asyncio.run(capture_full_page_with_playwright(
-        email=args.account,
-        password=args.password,
-        url=args.url,
-        output_name=args.output_name
-    ))
+    # 參數解析統一在 cli.py
+    from cli import main
+    sys.exit(main(['capture', 'fullpage', *sys.argv[1:]]))
@@ -0,0 +1,269 @@
+import os
+import time
+import hashlib
+import sys
+import cv2
+import numpy as np
+from crop_icon import CROP_BOX, crop_array
+
+# 這支模組為 icon 圖庫建立描述子索引，讓 rename_banner.py 不必對每個 icon 都跑 matchTemplate：
+#   1) 每個 icon 縮成固定大小的灰階向量（去平均、L2 正規化）作為描述子
+#   2) 以 k-means 分桶（IVF）後存成 .npz，查詢時只比對最近的幾個桶
+#   3) 取前 top-k 個候選 icon，只在 logo 附近用多尺度 matchTemplate 驗證
+
+# === 常數設定 ===
+script_dir = os.path.dirname(os.path.abspath(__file__))
+ICONS_DIR   = os.path.join(script_dir, '..', 'icons')
+BANNERS_DIR = os.path.join(script_dir, '..', 'banners')
+INDEX_FILE  = os.path.join(script_dir, '..', 'icon_index.npz')  # 持久化索引
+
+EMBED_SIZE   = (32, 12)                # 描述子取樣大小 (w, h)
+QUERY_SCALES = (0.85, 0.92, 1.0, 1.08, 1.15)  # banner 端裁切框的縮放倍率（容忍 logo 尺寸微調）
+VERIFY_SCALES = (0.9, 0.95, 1.0, 1.05, 1.1)   # matchTemplate 驗證時 icon 的縮放倍率
+VERIFY_MARGIN = 80                     # 驗證時只在 logo 裁切框外擴此像素的範圍內搜尋
+TOP_K        = 5
+MIN_IVF_SIZE = 256                     # icon 數量少於此值時直接暴力比對所有向量
+N_PROBE      = 4
+
+IMAGE_EXTS = ('.png', '.jpg', '.jpeg')
+
+
+def load_icons(icons_dir: str = ICONS_DIR) -> list[tuple[str, np.ndarray]]:
+    """載入 icon 資料夾內所有圖片，回傳 [(名稱, BGR 陣列), ...]"""
+    icons = []
+    for fn in sorted(os.listdir(icons_dir)):
+        if fn.lower().endswith(IMAGE_EXTS):
+            icon = cv2.imread(os.path.join(icons_dir, fn), cv2.IMREAD_COLOR)
+            if icon is not None:
+                name, _ = os.path.splitext(fn)
+                icons.append((name, icon))
+    return icons
+
+
+def embed(arr: np.ndarray) -> np.ndarray:
+    """把一張圖轉成去平均、L2 正規化後的 float32 向量"""
+    gray = cv2.cvtColor(arr, cv2.COLOR_BGR2GRAY) if arr.ndim == 3 else arr
+    small = cv2.resize(gray, EMBED_SIZE, interpolation=cv2.INTER_AREA).astype(np.float32).ravel()
+    small -= small.mean()
+    norm = np.linalg.norm(small)
+    return small / norm if norm > 0 else small
+
+
+def query_vectors(img: np.ndarray, box: tuple[int, int, int, int] = CROP_BOX) -> np.ndarray:
+    """以 logo 位置為中心，取多個尺度的裁切框產生查詢向量"""
+    x, y, w, h = box
+    cx, cy = x + w / 2, y + h / 2
+    vecs = []
+    for s in QUERY_SCALES:
+        sw, sh = int(round(w * s)), int(round(h * s))
+        sx, sy = int(round(cx - sw / 2)), int(round(cy - sh / 2))
+        crop = crop_array(img, (max(sx, 0), max(sy, 0), sw, sh))
+        if crop.shape[0] > 1 and crop.shape[1] > 1:
+            vecs.append(embed(crop))
+    return np.stack(vecs) if vecs else np.zeros((0, EMBED_SIZE[0] * EMBED_SIZE[1]), np.float32)
+
+
+def library_signature(icons_dir: str = ICONS_DIR) -> str:
+    """以檔名與檔案內容計算 icon 圖庫簽章，判斷索引是否過期（icons 每次都重新下載，不能用修改時間）"""
+    h = hashlib.sha1()
+    for fn in sorted(os.listdir(icons_dir)):
+        if fn.lower().endswith(IMAGE_EXTS):
+            h.update(fn.encode())
+            with open(os.path.join(icons_dir, fn), 'rb') as f:
+                h.update(hashlib.sha1(f.read()).digest())
+    return h.hexdigest()
+
+
+class IconIndex:
+    """icon 描述子的最近鄰索引（少量時為 flat，大量時為 IVF）"""
+
+    def __init__(self, names, vectors, centroids=None, assignments=None, signature='', icons_dir=ICONS_DIR):
+        self.names = list(names)
+        self.vectors = np.asarray(vectors, dtype=np.float32)
+        self.centroids = centroids
+        self.assignments = assignments
+        self.signature = signature
+        self.icons_dir = icons_dir
+        self._icons: dict[str, np.ndarray] = {}
+
+    def icon(self, name: str) -> np.ndarray | None:
+        """只在候選名單用到時才從磁碟讀取 icon"""
+        if name not in self._icons:
+            for ext in IMAGE_EXTS:
+                path = os.path.join(self.icons_dir, name + ext)
+                if os.path.exists(path):
+                    self._icons[name] = cv2.imread(path, cv2.IMREAD_COLOR)
+                    break
+            else:
+                self._icons[name] = None
+        return self._icons[name]
+
+    @classmethod
+    def build(cls, icons: list[tuple[str, np.ndarray]], signature: str = '', icons_dir: str = ICONS_DIR) -> 'IconIndex':
+        names = [n for n, _ in icons]
+        vectors = np.stack([embed(icon) for _, icon in icons]) if icons else np.zeros((0, EMBED_SIZE[0] * EMBED_SIZE[1]), np.float32)
+        centroids = assignments = None
+        if len(icons) >= MIN_IVF_SIZE:
+            n_list = int(np.sqrt(len(icons)))
+            criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 20, 1e-3)
+            _, labels, centroids = cv2.kmeans(vectors, n_list, None, criteria, 3, cv2.KMEANS_PP_CENTERS)
+            assignments = labels.ravel().astype(np.int32)
+        index = cls(names, vectors, centroids, assignments, signature, icons_dir)
+        index._icons = dict(icons)
+        return index
+
+    def save(self, path: str = INDEX_FILE) -> None:
+        np.savez(
+            path,
+            names=np.array(self.names),
+            vectors=self.vectors,
+            centroids=self.centroids if self.centroids is not None else np.zeros((0,)),
+            assignments=self.assignments if self.assignments is not None else np.zeros((0,), np.int32),
+            signature=np.array(self.signature),
+        )
+
+    @classmethod
+    def load(cls, path: str = INDEX_FILE, icons_dir: str = ICONS_DIR) -> 'IconIndex':
+        data = np.load(path, allow_pickle=False)
+        centroids = data['centroids'] if data['centroids'].size else None
+        assignments = data['assignments'] if data['assignments'].size else None
+        return cls(data['names'].tolist(), data['vectors'], centroids, assignments, str(data['signature']), icons_dir)
+
+    def search(self, queries: np.ndarray, k: int = TOP_K, n_probe: int = N_PROBE) -> list[tuple[int, float]]:
+        """回傳 [(icon 索引, 相似度), ...]，依相似度由高到低，最多 k 個"""
+        if len(queries) == 0 or len(self.vectors) == 0:
+            return []
+        if self.centroids is not None:
+            # 桶是以 k-means（L2 距離）分的，centroid 沒有正規化，所以用 L2 距離挑最近的桶
+            dists = ((queries * queries).sum(axis=1)[:, None] - 2 * queries @ self.centroids.T
+                     + (self.centroids * self.centroids).sum(axis=1)[None, :])
+            probe = np.argsort(dists.min(axis=0))[:n_probe]
+            candidates = np.flatnonzero(np.isin(self.assignments, probe))
+        else:
+            candidates = np.arange(len(self.vectors))
+        sims = (queries @ self.vectors[candidates].T).max(axis=0)
+        order = np.argsort(-sims)[:k]
+        return [(int(candidates[i]), float(sims[i])) for i in order]
+
+
+def load_or_build_index(icons_dir: str = ICONS_DIR, path: str = INDEX_FILE) -> IconIndex:
+    """圖庫未變動時直接讀取持久化索引（不需解碼任何 icon），否則重建並存檔"""
+    signature = library_signature(icons_dir)
+    if os.path.exists(path):
+        try:
+            index = IconIndex.load(path, icons_dir)
+            if index.signature == signature:
+                print(f"[Index] 使用既有索引：{path}（{len(index.names)} 個 icon）")
+                return index
+            print("[Index] icon 圖庫已變動，重建索引")
+        except Exception as e:
+            print(f"[Index] 無法讀取索引，重建：{e}")
+    start = time.perf_counter()
+    index = IconIndex.build(load_icons(icons_dir), signature, icons_dir)
+    index.save(path)
+    print(f"[Index] 已建立索引：{len(index.names)} 個 icon，耗時 {time.perf_counter() - start:.2f}s")
+    return index
+
+
+def match_template_multiscale(img: np.ndarray, icon: np.ndarray, scales=VERIFY_SCALES) -> float:
+    """在多個縮放倍率下跑 matchTemplate，回傳最高分"""
+    h, w = img.shape[:2]
+    best = -1.0
+    for s in scales:
+        tpl = icon if s == 1.0 else cv2.resize(icon, None, fx=s, fy=s, interpolation=cv2.INTER_AREA)
+        th, tw = tpl.shape[:2]
+        if th > h or tw > w or th < 2 or tw < 2:
+            continue
+        _, max_val, _, _ = cv2.minMaxLoc(cv2.matchTemplate(img, tpl, cv2.TM_CCOEFF_NORMED))
+        best = max(best, max_val)
+    return best
+
+
+def match_with_index(img: np.ndarray, index: IconIndex, k: int = TOP_K) -> tuple[str | None, float]:
+    """用索引取前 k 個候選，再以多尺度 matchTemplate 驗證，回傳 (最佳 icon 名稱, 分數)"""
+    x, y, w, h = CROP_BOX
+    x0, y0 = max(x - VERIFY_MARGIN, 0), max(y - VERIFY_MARGIN, 0)
+    roi = img[y0:y + h + VERIFY_MARGIN, x0:x + w + VERIFY_MARGIN]
+    best_name, best_score = None, -1.0
+    for i, _ in index.search(query_vectors(img), k=k):
+        name = index.names[i]
+        icon = index.icon(name)
+        if icon is None:
+            continue
+        score = match_template_multiscale(roi, icon)
+        if score > best_score:
+            best_name, best_score = name, score
+    return best_name, best_score
+
+
+def match_exhaustive(img: np.ndarray, icons: list[tuple[str, np.ndarray]], label: str | None = None) -> tuple[str | None, float]:
+    """原本的做法：對每個 icon 跑一次 matchTemplate；有給 label 時印出每組分數"""
+    best_name, best_score = None, -1.0
+    h, w = img.shape[:2]
+    for name, icon in icons:
+        ih, iw = icon.shape[:2]
+        if ih > h or iw > w:
+            continue
+        _, max_val, _, _ = cv2.minMaxLoc(cv2.matchTemplate(img, icon, cv2.TM_CCOEFF_NORMED))
+        if label is not None:
+            print(f"[DEBUG] {label} vs {name}: score={max_val:.4f}")
+        if max_val > best_score:
+            best_name, best_score = name, max_val
+    return best_name, best_score
+
+
+def evaluate(banners_dir: str, icons: list[tuple[str, np.ndarray]], index: IconIndex, threshold: float, k: int = TOP_K) -> dict:
+    """
+    以現行的 exhaustive matcher 為標準答案，計算索引 matcher 的 precision / recall 與耗時。
+    exhaustive 未匹配、索引卻匹配到的 banner（多半是 logo 縮放過）另計為 index_only，不算入 precision。
+    """
+    tp = fp = fn_ = index_only = 0
+    t_exh = t_idx = 0.0
+    rows = []
+    for fn in sorted(os.listdir(banners_dir)):
+        if not fn.lower().endswith(IMAGE_EXTS):
+            continue
+        img = cv2.imread(os.path.join(banners_dir, fn), cv2.IMREAD_COLOR)
+        if img is None:
+            continue
+        start = time.perf_counter()
+        exp_name, exp_score = match_exhaustive(img, icons)
+        t_exh += time.perf_counter() - start
+        start = time.perf_counter()
+        got_name, got_score = match_with_index(img, index, k=k)
+        t_idx += time.perf_counter() - start
+
+        expected = exp_name if exp_score >= threshold else None
+        got = got_name if got_score >= threshold else None
+        if got is not None:
+            if got == expected:
+                tp += 1
+            elif expected is None:
+                index_only += 1
+            else:
+                fp += 1
+        if expected is not None and got != expected:
+            fn_ += 1
+        rows.append({'banner': fn, 'exhaustive': expected, 'exhaustive_score': exp_score, 'index': got, 'index_score': got_score})
+        print(f"[Eval] {fn}: exhaustive={expected} ({exp_score:.4f}) / index={got} ({got_score:.4f})")
+
+    report = {
+        'banners': len(rows),
+        'icons': len(icons),
+        'top_k': k,
+        'precision': tp / (tp + fp) if tp + fp else 1.0,
+        'recall': tp / (tp + fn_) if tp + fn_ else 1.0,
+        'index_only': index_only,
+        'exhaustive_seconds': t_exh,
+        'index_seconds': t_idx,
+        'rows': rows,
+    }
+    print(f"[Eval] precision={report['precision']:.3f} recall={report['recall']:.3f} index_only={index_only} "
+          f"exhaustive={t_exh:.2f}s index={t_idx:.2f}s（{len(rows)} 張 banner / {len(icons)} 個 icon）")
+    return report
+
+
+if __name__ == '__main__':
+    # 參數解析統一在 cli.py
+    from cli import main
+    sys.exit(main(['index', *sys.argv[1:]]))
@@ -1,7 +1,8 @@
 import os
-import asyncio
-import argparse
+import json
+import sys
 from playwright.async_api import async_playwright, Page, BrowserContext
+from browser_profile import PROFILE_DIR, CacheStats, launch_profile
 
 # 常數設定
 LOGIN_URL = "https://www.shopback.com.tw/login"
@@ -17,14 +18,16 @@ async def is_logged_in(page: Page) -> bool:
     """
     return not await page.is_visible("text=登入")
 
-async def login_if_needed(context: BrowserContext, email: str, password: str) -> tuple[Page, bool]:
+async def login_if_needed(context: BrowserContext, email: str, password: str,
+                          page: Page | None = None) -> tuple[Page, bool]:
     """
     如未登入則執行多步驟登入，並將狀態保留在 Persistent Context
-    回傳已登入的 Page 物件。
+    回傳已登入的 Page 物件；未給 page 時開一個新分頁。
     """
     if not email or not password:
         raise ValueError("必須提供 email 及 password，請使用 -a 和 -p 提供")
-    page = await context.new_page()
+    if page is None:
+        page = await context.new_page()
     await page.goto(HOME_URL, wait_until="load", timeout=10000)
 
     print("🔐 未登入，開始登入...")
@@ -52,26 +55,48 @@ async def login_if_needed(context: BrowserContext, email: str, password: str) ->
     print("✅ 登入成功！")
     return page, True
 
-async def launch_and_login(email: str, password: str) -> Page:
-    # 確保 user_data 資料夾存在
-
+async def launch_and_login(email: str, password: str, persistent: bool = False,
+                           profile_dir: str = PROFILE_DIR) -> Page:
+    """
+    啟動瀏覽器並確保已登入。
+    persistent=True 時改用 profile_dir 的持久化 profile，保留 HTTP cache 與 service worker，
+    並在 context 關閉時回報 cache 命中率；預設仍是每次全新的 context 搭配 state.json。
+    """
     playwright = await async_playwright().start()
-    browser = await playwright.chromium.launch(headless=True)
 
-    if os.path.exists(STATE_FILE):
-        print(f"📥 使用現有 state.json: {STATE_FILE}")
-        context = await browser.new_context(storage_state=STATE_FILE)
+    cache_stats = None
+    if persistent:
+        # 確保 user_data 資料夾存在，損毀時會自動換成全新的 profile
+        context, reused = await launch_profile(playwright.chromium, profile_dir, headless=True)
+        if not reused and os.path.exists(STATE_FILE):
+            # 新 profile 沒有 cookie，先從 state.json 匯入，省掉一次登入
+            print(f"📥 新 profile，從 {STATE_FILE} 匯入 cookies")
+            with open(STATE_FILE, 'r', encoding='utf-8') as f:
+                await context.add_cookies(json.load(f).get('cookies', []))
+        cache_stats = CacheStats(profile_dir)
+        await cache_stats.attach(context)
     else:
-        print("📦 未找到 state.json，使用空白 context 並準備匯出新狀態")
-        context = await browser.new_context()
+        browser = await playwright.chromium.launch(headless=True)
+
+        if os.path.exists(STATE_FILE):
+            print(f"📥 使用現有 state.json: {STATE_FILE}")
+            context = await browser.new_context(storage_state=STATE_FILE)
+        else:
+            print("📦 未找到 state.json，使用空白 context 並準備匯出新狀態")
+            context = await browser.new_context()
 
     # 關閉預設空白分頁
     for p in list(context.pages):
         if p.url == "about:blank":
             await p.close()
 
+    # 登入用的分頁先開好，persistent 模式下等 CDP 統計就緒才導航，首頁的請求才不會漏算
+    page = await context.new_page()
+    if cache_stats:
+        await cache_stats.ready(page)
+
     # 執行登入檢查或流程
-    page, did_login = await login_if_needed(context, email, password)
+    page, did_login = await login_if_needed(context, email, password, page)
 
     # 登入成功後，儲存最新狀態
     print(f"📤 匯出 storage state 到 {STATE_FILE}")
@@ -82,10 +107,14 @@ async def launch_and_login(email: str, password: str) -> Page:
 
     return page
 
-if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description="Launch Playwright with storageState login.")
-    parser.add_argument('-a', '--account', required=True, help='ShopBack login email')
-    parser.add_argument('-p', '--password', required=True, help='ShopBack login password')
-    args = parser.parse_args()
+async def launch_anonymous() -> Page:
+    """不登入直接開啟空白 context（本機 fixture 站台測試用）"""
+    playwright = await async_playwright().start()
+    browser = await playwright.chromium.launch(headless=True)
+    context = await browser.new_context()
+    return await context.new_page()
 
-    page = asyncio.run(launch_and_login(email=args.account, password=args.password))
+if __name__ == "__main__":
+    # 參數解析統一在 cli.py
+    from cli import main
+    sys.exit(main(['login', *sys.argv[1:]]))
@@ -1,24 +1,168 @@
 # utils/banner.py
 # -*- coding: utf-8 -*-
-from typing import Callable, Awaitable, Optional
-from playwright.async_api import Page
+import time
+import asyncio
+from typing import Callable, Awaitable, Optional, Union
+from playwright.async_api import Page, TimeoutError as PlaywrightTimeoutError
 
 DEFAULT_CONTAINER = ".carousel-container"
+# 等下一次「切換完成」的上限（毫秒）；輪播沒有自動播放、被捲出畫面而暫停，
+# 或 slide 數量算多了（例如循環輪播的複製 slide）時，不會永遠卡住
+EVENT_TIMEOUT_MS = 30000
+
+# 頁面端的觀察器：每個 watcher 以 id 區分，各自有 window.__bannerWatchers[id] 與 window.__bannerQueues[id]，
+# 同一頁上可以同時觀察多個輪播而互不干擾
+_WATCHER_JS = """
+({ id, sel, nth, stableFrames, velocityEps, includeInitial }) => {
+  window.__bannerWatchers = window.__bannerWatchers || {};
+  window.__bannerQueues = window.__bannerQueues || {};
+  // 清理同一個 id 的舊 watcher（其他 id 不受影響）
+  if (window.__bannerWatchers[id] && window.__bannerWatchers[id].stop) {
+    window.__bannerWatchers[id].stop();
+  }
+  // 用 queue 跟 Python 溝通（Python 端用 wait_for_function 取值）
+  const queue = window.__bannerQueues[id] = [];
+
+  const container = document.querySelectorAll(sel)[nth];
+  if (!container) throw new Error("container not found: " + sel + " #" + nth);
+
+  function parseTranslateX(el) {
+    const cs = getComputedStyle(el);
+    const tf = cs.transform || el.style.transform || "none";
+    if (tf === "none") return 0;
+    if (tf.startsWith("matrix3d(")) {
+      const parts = tf.slice(9,-1).split(",").map(v => parseFloat(v.trim()));
+      return parts[12] || 0; // tx
+    }
+    if (tf.startsWith("matrix(")) {
+      const parts = tf.slice(7,-1).split(",").map(v => parseFloat(v.trim()));
+      return parts[4] || 0;  // tx
+    }
+    const m = tf.match(/translate3d\\((-?\\d+(?:\\.\\d+)?)px/);
+    if (m) return parseFloat(m[1]);
+    const m2 = tf.match(/translate\\((-?\\d+(?:\\.\\d+)?)px/);
+    if (m2) return parseFloat(m2[1]);
+    return 0;
+  }
+
+  function slideWidth(container) {
+    const first = container.querySelector('[data-ui-element-name="hero banner"]') || container.firstElementChild;
+    if (!first) return 0;
+    const r = first.getBoundingClientRect();
+    return r.width || 0;
+  }
+
+  function currentIndex(container, w) {
+    const x = parseTranslateX(container);
+    if (w <= 1) return 0;
+    return Math.round(Math.abs(x) / w);
+  }
+
+  // 每筆事件帶上判定穩定的時間 ts 與停止移動的時間 settled（epoch 秒），供截圖端挑畫面、計算延遲
+  const epoch = (t) => (performance.timeOrigin + t) / 1000;
+  function emit(idx, settled) {
+    const ts = epoch(performance.now());
+    queue.push({ idx, ts, settled: settled === undefined ? ts : settled });
+  }
+
+  const w = slideWidth(container) || 1;
+  let prevIdx = currentIndex(container, w);
+  let lastX = parseTranslateX(container);
+  let stableCount = 0;
+  let targetIdx = prevIdx;
+  let step = 0; // 0: 等待索引變化；1: 等待穩定
+  let prevTs = performance.now();
+  let settledAt = 0; // 穩定計數開始前最後一次畫出新位置的時間
+  let stopped = false;
+  let rafId = 0;
+
+  if (includeInitial) {
+    // 先把當前 index 當作第 1 次事件
+    emit(prevIdx);
+  }
+
+  function loop(now) {
+    if (stopped) return;
+    const x = parseTranslateX(container);
+    const curIdx = currentIndex(container, w);
+    const v = Math.abs(x - lastX);
+
+    if (step === 0) {
+      if (curIdx !== prevIdx) {
+        step = 1;
+        targetIdx = curIdx;
+        stableCount = 0;
+      }
+    } else {
+      if (curIdx === targetIdx && v <= velocityEps) {
+        if (stableCount === 0) settledAt = epoch(prevTs);
+        stableCount++;
+        if (stableCount >= stableFrames) {
+          prevIdx = targetIdx;
+          step = 0;
+          stableCount = 0;
+          emit(prevIdx, settledAt);
+        }
+      } else {
+        if (curIdx !== targetIdx) targetIdx = curIdx;
+        stableCount = 0;
+      }
+    }
+
+    lastX = x;
+    prevTs = now;
+    rafId = requestAnimationFrame(loop);
+  }
+
+  rafId = requestAnimationFrame(loop);
+
+  window.__bannerWatchers[id] = {
+    stop() {
+      stopped = true;
+      if (rafId) cancelAnimationFrame(rafId);
+    }
+  };
+}
+"""
+
+# 每個輪播的 slide 數量：優先數 hero banner，否則數直接子元素
+_COUNT_SLIDES_JS = """
+(sel) => Array.from(document.querySelectorAll(sel)).map(c =>
+  c.querySelectorAll(':scope > [data-ui-element-name="hero banner"]').length || c.children.length)
+"""
+
+# on_switch(call_index, current_index)；pass_event_time=True 時多傳 event_ts 與 settled_ts
+SwitchCallback = Union[
+    Callable[[int, int], Awaitable[None]],
+    Callable[[int, int, float, float], Awaitable[None]],
+]
+# observe_all_carousels 在最前面多傳 carousel_index
+CarouselSwitchCallback = Union[
+    Callable[[int, int, int], Awaitable[None]],
+    Callable[[int, int, int, float, float], Awaitable[None]],
+]
+
 
 async def observe_banner_rotations(
     page: Page,
-    on_switch: Callable[[int, int], Awaitable[None]],
+    on_switch: SwitchCallback,
     *,
     container_selector: str = DEFAULT_CONTAINER,
+    nth: int = 0,                        # 同一個 selector 對到多個輪播時，觀察第幾個
     max_switches: Optional[int] = None,  # None 表示無限觀察直到外部中止
     stable_frames: int = 10,             # 連續幀穩定的門檻
     velocity_eps: float = 0.5,           # 速度近似 0 的閾值（px/幀）
     include_initial: bool = True,        # 是否先對目前顯示的那張觸發一次
-) -> None:
+    pass_event_time: bool = False,       # True 時多傳頁面端判定穩定與停止移動的時間（epoch 秒）
+    event_timeout_ms: int = EVENT_TIMEOUT_MS,  # 等下一次切換的上限，逾時就停止並回傳
+) -> int:
     """
-    觀察唯一的 .carousel-container，每當「切換完成」就觸發 on_switch(call_index, current_index)
+    觀察第 nth 個 container_selector，每當「切換完成」就觸發 on_switch(call_index, current_index)
       - call_index 從 1 開始計數
       - current_index 是 0-based 的穩定索引
+      - pass_event_time=True 時呼叫 on_switch(call_index, current_index, event_ts, settled_ts)，
+        event_ts 是判定穩定的時間，settled_ts 是輪播最後一次畫出新位置的時間（之後畫面不再變化）
+    回傳實際觸發的次數；event_timeout_ms 內沒有新的切換就停止觀察，回傳目前為止的次數。
 
     注意：不在此方法內做任何截圖或 I/O，全部交給 on_switch。
     """
@@ -26,108 +170,13 @@ async def observe_banner_rotations(
     await page.wait_for_selector(container_selector, timeout=15000)
 
     # 在頁面端設置觀察器，完成一次切換就 push 索引到 queue
+    watcher_id = f"{container_selector}#{nth}"
     await page.evaluate(
-        """
-        ({ sel, stableFrames, velocityEps, includeInitial }) => {
-          // 清理舊 watcher
-          if (window.__bannerWatcher && window.__bannerWatcher.stop) {
-            window.__bannerWatcher.stop();
-          }
-          // 用 queue 跟 Python 溝通（Python 端用 wait_for_function 取值）
-          window.__bannerQueue = [];
-
-          const container = document.querySelector(sel);
-          if (!container) throw new Error("container not found: " + sel);
-
-          function parseTranslateX(el) {
-            const cs = getComputedStyle(el);
-            const tf = cs.transform || el.style.transform || "none";
-            if (tf === "none") return 0;
-            if (tf.startsWith("matrix3d(")) {
-              const parts = tf.slice(9,-1).split(",").map(v => parseFloat(v.trim()));
-              return parts[12] || 0; // tx
-            }
-            if (tf.startsWith("matrix(")) {
-              const parts = tf.slice(7,-1).split(",").map(v => parseFloat(v.trim()));
-              return parts[4] || 0;  // tx
-            }
-            const m = tf.match(/translate3d\\((-?\\d+(?:\\.\\d+)?)px/);
-            if (m) return parseFloat(m[1]);
-            const m2 = tf.match(/translate\\((-?\\d+(?:\\.\\d+)?)px/);
-            if (m2) return parseFloat(m2[1]);
-            return 0;
-          }
-
-          function slideWidth(container) {
-            const first = container.querySelector('[data-ui-element-name="hero banner"]') || container.firstElementChild;
-            if (!first) return 0;
-            const r = first.getBoundingClientRect();
-            return r.width || 0;
-          }
-
-          function currentIndex(container, w) {
-            const x = parseTranslateX(container);
-            if (w <= 1) return 0;
-            return Math.round(Math.abs(x) / w);
-          }
-
-          const w = slideWidth(container) || 1;
-          let prevIdx = currentIndex(container, w);
-          let lastX = parseTranslateX(container);
-          let stableCount = 0;
-          let targetIdx = prevIdx;
-          let step = 0; // 0: 等待索引變化；1: 等待穩定
-          let stopped = false;
-          let rafId = 0;
-
-          if (includeInitial) {
-            // 先把當前 index 當作第 1 次事件
-            window.__bannerQueue.push(prevIdx);
-          }
-
-          function loop() {
-            if (stopped) return;
-            const x = parseTranslateX(container);
-            const curIdx = currentIndex(container, w);
-            const v = Math.abs(x - lastX);
-
-            if (step === 0) {
-              if (curIdx !== prevIdx) {
-                step = 1;
-                targetIdx = curIdx;
-                stableCount = 0;
-              }
-            } else {
-              if (curIdx === targetIdx && v <= velocityEps) {
-                stableCount++;
-                if (stableCount >= stableFrames) {
-                  prevIdx = targetIdx;
-                  step = 0;
-                  stableCount = 0;
-                  window.__bannerQueue.push(prevIdx);
-                }
-              } else {
-                if (curIdx !== targetIdx) targetIdx = curIdx;
-                stableCount = 0;
-              }
-            }
-
-            lastX = x;
-            rafId = requestAnimationFrame(loop);
-          }
-
-          rafId = requestAnimationFrame(loop);
-
-          window.__bannerWatcher = {
-            stop() {
-              stopped = true;
-              if (rafId) cancelAnimationFrame(rafId);
-            }
-          };
-        }
-        """,
+        _WATCHER_JS,
         arg={
+            "id": watcher_id,
             "sel": container_selector,
+            "nth": nth,
             "stableFrames": stable_frames,
             "velocityEps": velocity_eps,
             "includeInitial": include_initial,
@@ -136,15 +185,64 @@ async def observe_banner_rotations(
 
     # 逐次等 queue 有值，取出索引後呼叫 callback
     fired = 0
-    while True:
-        if max_switches is not None and fired >= max_switches:
-            # 停止頁面端 watcher
-            await page.evaluate("window.__bannerWatcher && window.__bannerWatcher.stop();")
-            break
-
+    while max_switches is None or fired < max_switches:
         # 等到有事件進 queue
-        await page.wait_for_function("() => Array.isArray(window.__bannerQueue) && window.__bannerQueue.length > 0")
-        idx = await page.evaluate("() => window.__bannerQueue.shift()")
+        try:
+            await page.wait_for_function(
+                "(id) => Array.isArray(window.__bannerQueues[id]) && window.__bannerQueues[id].length > 0",
+                arg=watcher_id,
+                timeout=event_timeout_ms,
+            )
+        except PlaywrightTimeoutError:
+            print(f"[Observe] {watcher_id} 超過 {event_timeout_ms}ms 沒有新的切換，"
+                  f"停止觀察（已觸發 {fired} 次）")
+            break
+        event = await page.evaluate("(id) => window.__bannerQueues[id].shift()", watcher_id)
         fired += 1
         # 呼叫外部 callback
-        await on_switch(fired, int(idx))
+        if pass_event_time:
+            await on_switch(fired, int(event["idx"]), float(event["ts"]), float(event["settled"]))
+        else:
+            await on_switch(fired, int(event["idx"]))
+
+    # 停止頁面端 watcher
+    await page.evaluate("(id) => window.__bannerWatchers[id] && window.__bannerWatchers[id].stop()", watcher_id)
+    return fired
+
+
+async def observe_all_carousels(
+    page: Page,
+    on_switch: CarouselSwitchCallback,
+    *,
+    container_selector: str = DEFAULT_CONTAINER,
+    max_switches: Optional[int] = None,  # None 表示每個輪播各觸發 slide 數量次
+    **kwargs,
+) -> list[dict]:
+    """
+    同時觀察頁面上所有 container_selector，每個輪播有自己的 watcher 與事件 queue。
+    on_switch(carousel_index, call_index, current_index[, event_ts, settled_ts])；所有輪播並行等待，
+    總耗時約等於最慢的那一個。某個輪播逾時只會停止它自己，不影響其他輪播。
+    回傳每個輪播的 {'slides', 'captured', 'seconds'}（seconds 為從開始到該輪播結束的時間）。
+    """
+    await page.wait_for_selector(container_selector, timeout=15000)
+    counts = await page.evaluate(_COUNT_SLIDES_JS, container_selector)
+    print(f"[Observe] 偵測到 {len(counts)} 個輪播，slide 數量：{counts}")
+
+    start = time.perf_counter()
+    results = [{'slides': n, 'captured': 0, 'seconds': 0.0} for n in counts]
+
+    async def watch(carousel_index: int, count: int):
+        async def callback(call_index: int, current_index: int, *event_times: float):
+            await on_switch(carousel_index, call_index, current_index, *event_times)
+        results[carousel_index]['captured'] = await observe_banner_rotations(
+            page,
+            callback,
+            container_selector=container_selector,
+            nth=carousel_index,
+            max_switches=max_switches if max_switches is not None else count,
+            **kwargs,
+        )
+        results[carousel_index]['seconds'] = round(time.perf_counter() - start, 2)
+
+    await asyncio.gather(*(watch(i, n) for i, n in enumerate(counts) if n > 0))
+    return results
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+from datetime import datetime
+from playwright.async_api import Page
+
+# 這支模組在截圖時收集瀏覽器端的效能數據（CDP + Performance API）：
+#   - navigation timing、LCP
+#   - 依資源類型統計的傳輸量與請求數
+#   - 截圖當下的 JS heap 大小
+# 每個產出物旁邊寫一份 <檔名>.metrics.json，本次 run 寫出的那些再彙整成該資料夾的 metrics_report.json
+
+REPORT_NAME = 'metrics_report.json'
+METRICS_SUFFIX = '.metrics.json'
+
+# 盡早在頁面端開始記錄 LCP，並放大 resource timing buffer（預設只有 250 筆）
+_INIT_JS = """
+(() => {
+  try { performance.setResourceTimingBufferSize(10000); } catch (e) {}
+  window.__lcp = 0;
+  try {
+    new PerformanceObserver(list => {
+      for (const e of list.getEntries()) window.__lcp = Math.max(window.__lcp, e.startTime);
+    }).observe({ type: 'largest-contentful-paint', buffered: true });
+  } catch (e) {}
+})();
+"""
+
+_TIMING_JS = """
+() => {
+  const nav = performance.getEntriesByType('navigation')[0];
+  const fcp = performance.getEntriesByName('first-contentful-paint')[0];
+  return {
+    url: location.href,
+    navigation: nav ? {
+      ttfb: nav.responseStart,
+      domContentLoaded: nav.domContentLoadedEventEnd,
+      load: nav.loadEventEnd,
+      duration: nav.duration,
+      transferSize: nav.transferSize,
+    } : null,
+    fcp: fcp ? fcp.startTime : null,
+    lcp: window.__lcp || null,
+  };
+}
+"""
+
+
+class PageMetrics:
+    """
+    在 page.goto 之前 start()，截圖後 collect()。
+    傳輸量以 CDP Network 事件統計（跨網域資源在 Resource Timing 中 transferSize 會是 0）。
+    """
+
+    def __init__(self, page: Page):
+        self.page = page
+        self.cdp = None
+        self.types: dict[str, str] = {}
+        self.by_type: dict[str, dict] = {}
+        self.failed = 0
+
+    async def start(self) -> None:
+        await self.page.add_init_script(_INIT_JS)
+        self.cdp = await self.page.context.new_cdp_session(self.page)
+        self.cdp.on("Network.responseReceived", self._on_response)
+        self.cdp.on("Network.loadingFinished", self._on_finished)
+        self.cdp.on("Network.loadingFailed", self._on_failed)
+        await self.cdp.send("Network.enable")
+        await self.cdp.send("Performance.enable")
+
+    def _on_response(self, params: dict) -> None:
+        self.types[params["requestId"]] = params.get("type", "Other")
+
+    def _on_finished(self, params: dict) -> None:
+        rtype = self.types.pop(params["requestId"], "Other")
+        stat = self.by_type.setdefault(rtype, {"requests": 0, "bytes": 0})
+        stat["requests"] += 1
+        stat["bytes"] += int(params.get("encodedDataLength", 0))
+
+    def _on_failed(self, params: dict) -> None:
+        self.types.pop(params["requestId"], None)
+        self.failed += 1
+
+    async def collect(self) -> dict:
+        perf = await self.cdp.send("Performance.getMetrics")
+        values = {m["name"]: m["value"] for m in perf.get("metrics", [])}
+        timing = await self.page.evaluate(_TIMING_JS)
+        return {
+            **timing,
+            "collected_at": datetime.now().isoformat(timespec="seconds"),
+            "requests": sum(s["requests"] for s in self.by_type.values()),
+            "failed_requests": self.failed,
+            "transfer_bytes": sum(s["bytes"] for s in self.by_type.values()),
+            "by_type": self.by_type,
+            "js_heap_used": values.get("JSHeapUsedSize"),
+            "js_heap_total": values.get("JSHeapTotalSize"),
+            "dom_nodes": values.get("Nodes"),
+        }
+
+    async def stop(self) -> None:
+        if self.cdp is not None:
+            await self.cdp.detach()
+            self.cdp = None
+
+
+def write_metrics(artifact_path: str, metrics: dict, **extra) -> str:
+    """寫出 <artifact>.metrics.json；extra 可附帶其他資訊（例如 readiness telemetry）"""
+    path = os.path.splitext(artifact_path)[0] + METRICS_SUFFIX
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"artifact": os.path.basename(artifact_path), **metrics, **extra}, f, ensure_ascii=False, indent=2)
+    print(f"[Metrics] 已寫入 {path}")
+    return path
+
+
+def write_run_report(output_dir: str, metrics_paths: list[str]) -> str:
+    """
+    把本次 run 寫出的 metrics_paths（write_metrics 的回傳值）彙整成 output_dir 的 metrics_report.json
+    （每次 run 一份，供長期趨勢比較）。資料夾內之前 run 留下的 *.metrics.json 不列入。
+    """
+    pages = []
+    for path in metrics_paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            pages.append(json.load(f))
+
+    by_type: dict[str, dict] = {}
+    for p in pages:
+        for rtype, stat in p.get("by_type", {}).items():
+            agg = by_type.setdefault(rtype, {"requests": 0, "bytes": 0})
+            agg["requests"] += stat["requests"]
+            agg["bytes"] += stat["bytes"]
+
+    lcps = [p["lcp"] for p in pages if p.get("lcp")]
+    report = {
+        "run_id": os.environ.get("GITHUB_RUN_ID"),
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "pages": len(pages),
+        "requests": sum(p.get("requests", 0) for p in pages),
+        "transfer_bytes": sum(p.get("transfer_bytes", 0) for p in pages),
+        "max_lcp": max(lcps) if lcps else None,
+        "by_type": dict(sorted(by_type.items(), key=lambda kv: -kv[1]["bytes"])),
+        "details": pages,
+    }
+    path = os.path.join(output_dir, REPORT_NAME)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"[Metrics] 本次共 {len(pages)} 頁、{report['requests']} 個請求、"
+          f"{report['transfer_bytes'] / 1024 / 1024:.1f} MB，報告：{path}")
+    return path
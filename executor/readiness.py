@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+import time
+import asyncio
+import weakref
+from typing import Optional, Union
+from playwright.async_api import Page, Request, Locator
+
+# 這支模組取代截圖前的固定 sleep：等到真正的訊號成立就立刻截圖
+#   - fonts：document.fonts.ready
+#   - images：viewport 內所有 <img> 都已 decode
+#   - animations：目標元素（或整頁）沒有進行中的 CSS animation / transition
+#   - network：連續 network_quiet_ms 毫秒沒有進行中的請求
+# 每個條件都有 timeout，逾時只記錄警告、不會中斷截圖流程。
+
+DEFAULT_TIMEOUT_MS = 10000
+DEFAULT_NETWORK_QUIET_MS = 500
+
+_FONTS_JS = "() => document.fonts.ready.then(() => true)"
+
+_IMAGES_JS = """
+() => {
+  const vw = window.innerWidth, vh = window.innerHeight;
+  const imgs = Array.from(document.images).filter(img => {
+    const r = img.getBoundingClientRect();
+    return r.width > 0 && r.height > 0 && r.bottom > 0 && r.right > 0 && r.top < vh && r.left < vw;
+  });
+  // decode() 會等圖片載入完成；載入失敗的圖片不應卡住截圖
+  return Promise.all(imgs.map(img => img.decode().catch(() => null))).then(() => imgs.length);
+}
+"""
+
+_ANIMATIONS_JS = """
+(root) => {
+  // root 為目標元素（ElementHandle），null 表示整頁
+  const anims = root ? root.getAnimations({ subtree: true }) : document.getAnimations();
+  // 無限循環的動畫（loading spinner 等）永遠不會結束，不列入判斷
+  return anims.every(a => a.playState !== 'running' || a.effect?.getTiming().iterations === Infinity);
+}
+"""
+
+
+class NetworkTracker:
+    """記錄頁面進行中的請求數與最後一次網路活動時間"""
+
+    def __init__(self, page: Page):
+        self.inflight: set[Request] = set()
+        self.last_activity = time.monotonic()
+        page.on("request", self._on_start)
+        page.on("requestfinished", self._on_end)
+        page.on("requestfailed", self._on_end)
+
+    def _on_start(self, request: Request):
+        self.inflight.add(request)
+        self.last_activity = time.monotonic()
+
+    def _on_end(self, request: Request):
+        self.inflight.discard(request)
+        self.last_activity = time.monotonic()
+
+    def quiet_for(self) -> float:
+        """目前已安靜多少秒（仍有請求進行中則為 0）"""
+        if self.inflight:
+            return 0.0
+        return time.monotonic() - self.last_activity
+
+
+_trackers: "weakref.WeakKeyDictionary[Page, NetworkTracker]" = weakref.WeakKeyDictionary()
+
+
+def track_network(page: Page) -> NetworkTracker:
+    """
+    為 page 掛上網路追蹤（重複呼叫只會掛一次）。
+    建議在 page.goto 之前呼叫，才能追蹤到導航時發出的請求。
+    """
+    if page not in _trackers:
+        _trackers[page] = NetworkTracker(page)
+    return _trackers[page]
+
+
+async def wait_for_network_quiet(page: Page, quiet_ms: int = DEFAULT_NETWORK_QUIET_MS, timeout_ms: int = DEFAULT_TIMEOUT_MS) -> None:
+    tracker = track_network(page)
+    deadline = time.monotonic() + timeout_ms / 1000
+    while tracker.quiet_for() * 1000 < quiet_ms:
+        if time.monotonic() >= deadline:
+            raise asyncio.TimeoutError()
+        await asyncio.sleep(0.05)
+
+
+async def wait_for_animations(page: Page, target: Union[str, Locator, None] = None,
+                              timeout_ms: int = DEFAULT_TIMEOUT_MS) -> None:
+    """
+    等 target 內（None 表示整頁）沒有進行中的 animation / transition。
+    target 可以是 Playwright selector（支援 :has-text() 等語法）或 Locator，取第一個符合的元素。
+    """
+    handle = None
+    if target is not None:
+        locator = page.locator(target) if isinstance(target, str) else target
+        handle = await locator.first.element_handle(timeout=timeout_ms)
+    try:
+        await page.wait_for_function(_ANIMATIONS_JS, arg=handle, polling="raf", timeout=timeout_ms)
+    finally:
+        if handle is not None:
+            await handle.dispose()
+
+
+async def wait_until_ready(
+    page: Page,
+    target: Union[str, Locator, None] = None,
+    *,
+    fonts: bool = True,
+    images: bool = True,
+    animations: bool = True,
+    network_quiet_ms: Optional[int] = DEFAULT_NETWORK_QUIET_MS,  # None 表示不等網路
+    timeout_ms: int = DEFAULT_TIMEOUT_MS,                         # 每個條件各自的上限
+    label: str = "",
+) -> dict:
+    """
+    依序等待各個條件成立，回傳每個條件花費的秒數：
+      {'conditions': {'fonts': 0.01, ...}, 'timed_out': [...], 'total': 0.8, 'slowest': 'network'}
+    target 為 Playwright selector 或 Locator，只用在 animations 判斷；None 表示整頁。
+    """
+    checks = []
+    if fonts:
+        checks.append(("fonts", lambda: page.evaluate(_FONTS_JS)))
+    if images:
+        checks.append(("images", lambda: page.evaluate(_IMAGES_JS)))
+    if animations:
+        checks.append(("animations", lambda: wait_for_animations(page, target, timeout_ms)))
+    if network_quiet_ms is not None:
+        checks.append(("network", lambda: wait_for_network_quiet(page, network_quiet_ms, timeout_ms)))
+
+    conditions = {}
+    timed_out = []
+    start = time.perf_counter()
+    for name, check in checks:
+        t0 = time.perf_counter()
+        try:
+            await asyncio.wait_for(check(), timeout=timeout_ms / 1000)
+        except Exception as e:
+            # 逾時（asyncio 或 Playwright 的 TimeoutError）只記錄，不中斷截圖
+            timed_out.append(name)
+            print(f"[Ready] {label} 等待 {name} 逾時或失敗：{type(e).__name__}")
+        conditions[name] = time.perf_counter() - t0
+
+    telemetry = {
+        "conditions": conditions,
+        "timed_out": timed_out,
+        "total": time.perf_counter() - start,
+        "slowest": max(conditions, key=conditions.get) if conditions else None,
+    }
+    detail = ", ".join(f"{k}={v:.2f}s" for k, v in conditions.items())
+    print(f"[Ready] {label} 就緒，共 {telemetry['total']:.2f}s（{detail}；最久：{telemetry['slowest']}）")
+    return telemetry
@@ -1,10 +1,12 @@
 import os
 import cv2
-import shutil
-import subprocess
+import sys
 from datetime import datetime
 import pytz
 import re
+from artifact_store import ArtifactStore
+from crop_icon import ICON_KIND, crop_unknown_icons
+from icon_index import TOP_K, load_icons, load_or_build_index, match_exhaustive, match_with_index
 
 # === 參數設定 ===
 # 取得這支 script 的資料夾
@@ -13,92 +15,90 @@ script_dir = os.path.dirname(os.path.abspath(__file__))
 ICONS_DIR    = os.path.join(script_dir, '..', 'icons')           # icon 資料夾
 BANNERS_DIR  = os.path.join(script_dir, '..', 'banners')         # 原始大圖資料夾
 OUTPUT_DIR   = os.path.join(script_dir, '..', 'rename_banners')  # 處理後輸出資料夾
-CROP_SCRIPT  = os.path.join(script_dir, 'crop_icon.py')          # 你的裁切腳本
 
 THRESHOLD    = 0.95                                              # matchTemplate 相似度門檻
 
-# 確保輸出資料夾存在
-os.makedirs(OUTPUT_DIR, exist_ok=True)
-
-# 1) 載入所有 icon
-icons = []
-for fn in os.listdir(ICONS_DIR):
-    if fn.lower().endswith(('.png','.jpg','.jpeg')):
-        path = os.path.join(ICONS_DIR, fn)
-        icon = cv2.imread(path, cv2.IMREAD_COLOR)
-        if icon is not None:
-            name, _ = os.path.splitext(fn)
-            icons.append((name, icon))
-print(f"[INFO] 載入 icons：{[n for n,_ in icons]}")
-
-index = 0
-# 2) 逐張處理 banner
-for fn in sorted(os.listdir(BANNERS_DIR)):
-    index += 1
-    if not fn.lower().endswith(('.png','.jpg','.jpeg')):
-        continue
-
-    banner_path = os.path.join(BANNERS_DIR, fn)
-    img = cv2.imread(banner_path, cv2.IMREAD_COLOR)
-    if img is None:
-        print(f"[WARN] 讀取失敗：{fn}")
-        continue
-
-    best_name  = None
-    best_score = -1.0
-
-    # 3) template matching
-    for name, icon in icons:
-        ih, iw = icon.shape[:2]
-        h, w   = img.shape[:2]
-        if ih > h or iw > w:
-            continue
 
-        res = cv2.matchTemplate(img, icon, cv2.TM_CCOEFF_NORMED)
-        _, max_val, _, _ = cv2.minMaxLoc(res)
-        print(f"[DEBUG] {fn} vs {name}: score={max_val:.4f}")
-
-        if max_val > best_score:
-            best_score = max_val
-            best_name  = name
-
-    # 取得副檔名
-    _, ext = os.path.splitext(fn)
-
-    # 指定時區名稱（例：Asia/Taipei）
-    tz = pytz.timezone("Asia/Taipei")
-
-    # 取得現在時間（含指定時區）
-    now = datetime.now(tz)
-    
-    # 取得當前日期字串 (YYYY_MMDD)
-    date_str = now.strftime("%Y_%m%d")
-
-    # 4a) match 成功 → 複製並改名
-    if best_score >= THRESHOLD:
-        m = re.match(r'^(.+)_\d+$', best_name)
-        if m:
-            best_name = m.group(1)
-            
-        new_fn = f"{date_str}_web_banner_{best_name}{ext}"
-        print(f"[MATCH] {fn} → {new_fn} (score={best_score:.4f})")
-        shutil.copy(banner_path, os.path.join(OUTPUT_DIR, new_fn))
-
-    # 4b) match 失敗 → 改名不包含品牌，複製原檔並呼叫 crop_icon.py
+def rename_banners(matcher: str = 'exhaustive', top_k: int = TOP_K):
+    # 確保輸出資料夾存在
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    # 輸出檔以 hard link 指向 artifact store，相同內容只存一份
+    store = ArtifactStore()
+
+    # 1) 載入所有 icon（index 模式只載入索引，候選 icon 用到時才讀檔）
+    if matcher == 'index':
+        index = load_or_build_index(ICONS_DIR)
     else:
-        new_fn = f"{date_str}_web_banner_{index}{ext}"
-        print(f"[NO MATCH] {fn} → {new_fn} (best={best_name}, score={best_score:.4f})")
-        # 先把原 banner 複製到 OUTPUT_DIR
-        shutil.copy(banner_path, os.path.join(OUTPUT_DIR, new_fn))
-
-        # 再用 subprocess 呼叫 crop_icon.py
-        cmd = ['python', CROP_SCRIPT, banner_path]
-
-        print(f"[CROP-START] 呼叫裁切腳本：{' '.join(cmd)}")
-        try:
-            subprocess.run(cmd, check=True)
-            print(f"[CROP-DONE] {fn} 已裁切 icon 到 {OUTPUT_DIR}")
-        except subprocess.CalledProcessError as e:
-            print(f"[ERROR] 裁切失敗：{e}")
-
-print("\n所有處理完成，請至 rename_banners 檢查結果！")
+        icons = load_icons(ICONS_DIR)
+        print(f"[INFO] 載入 icons：{[n for n,_ in icons]}")
+
+    index_no = 0
+    # 未匹配的 banner，最後一次批次裁切 icon
+    unmatched = []
+    # 2) 逐張處理 banner
+    for fn in sorted(os.listdir(BANNERS_DIR)):
+        index_no += 1
+        if not fn.lower().endswith(('.png','.jpg','.jpeg')):
+            continue
+
+        banner_path = os.path.join(BANNERS_DIR, fn)
+        img = cv2.imread(banner_path, cv2.IMREAD_COLOR)
+        if img is None:
+            print(f"[WARN] 讀取失敗：{fn}")
+            continue
+
+        # 3) template matching
+        if matcher == 'index':
+            best_name, best_score = match_with_index(img, index, k=top_k)
+        else:
+            best_name, best_score = match_exhaustive(img, icons, label=fn)
+
+        # 取得副檔名
+        _, ext = os.path.splitext(fn)
+
+        # 指定時區名稱（例：Asia/Taipei）
+        tz = pytz.timezone("Asia/Taipei")
+
+        # 取得現在時間（含指定時區）
+        now = datetime.now(tz)
+
+        # 取得當前日期字串 (YYYY_MMDD)
+        date_str = now.strftime("%Y_%m%d")
+
+        # 4a) match 成功 → 複製並改名
+        if best_score >= THRESHOLD:
+            m = re.match(r'^(.+)_\d+$', best_name)
+            if m:
+                best_name = m.group(1)
+
+            new_fn = f"{date_str}_web_banner_{best_name}{ext}"
+            print(f"[MATCH] {fn} → {new_fn} (score={best_score:.4f})")
+            store.link(banner_path, os.path.join(OUTPUT_DIR, new_fn), 'rename_banners',
+                       target=fn, brand=best_name, score=best_score)
+
+        # 4b) match 失敗 → 改名不包含品牌，複製原檔並留待批次裁切 icon
+        else:
+            new_fn = f"{date_str}_web_banner_{index_no}{ext}"
+            print(f"[NO MATCH] {fn} → {new_fn} (best={best_name}, score={best_score:.4f})")
+            # 先把原 banner 放到 OUTPUT_DIR
+            store.link(banner_path, os.path.join(OUTPUT_DIR, new_fn), 'rename_banners',
+                       target=fn, score=best_score)
+            unmatched.append((fn, img))
+
+    # 5) 未匹配的 banner 一次裁切 icon，相同品牌只輸出一張
+    if unmatched:
+        print(f"[CROP-START] 批次裁切 {len(unmatched)} 張未匹配 banner 的 icon")
+        clusters = crop_unknown_icons(unmatched)
+        for c in clusters:
+            if c['path']:
+                store.put(c['path'], ICON_KIND, target=c['name'])
+        print(f"[CROP-DONE] 共 {len(clusters)} 個未知品牌，新輸出 {sum(1 for c in clusters if c['path'])} 張 icon")
+
+    store.close()
+    print("\n所有處理完成，請至 rename_banners 檢查結果！")
+
+
+if __name__ == '__main__':
+    # 參數解析統一在 cli.py
+    from cli import main
+    sys.exit(main(['match', *sys.argv[1:]]))
@@ -1,18 +1,21 @@
 import os
-import time
 import asyncio
-import argparse
+import sys
 from datetime import datetime
 import pytz
 from playwright.async_api import async_playwright
 from login import launch_and_login, HOME_URL
+from artifact_store import ArtifactStore, release
+from page_metrics import PageMetrics, write_metrics, write_run_report
+from readiness import track_network, wait_for_network_quiet, wait_until_ready
 
 # 取得這支 script 的資料夾
 script_dir = os.path.dirname(os.path.abspath(__file__))
 # 圖片儲存資料夾
 OUTPUT_DIR = os.path.join(script_dir, '..', 'rewards_section_screenshot')
 
-async def capture_rewards_section(email: str, password: str):
+async def capture_rewards_section(email: str, password: str, collect_metrics: bool = False,
+                                  persistent_profile: bool = False):
     # 1. 產生日期字串 yyyy_mmdd
     
     tz = pytz.timezone("Asia/Taipei")
@@ -23,13 +26,17 @@ async def capture_rewards_section(email: str, password: str):
     output_path = f"{OUTPUT_DIR}/{filename}"
 
     async with async_playwright() as p:
-        page = await launch_and_login(email=email, password=password)
+        page = await launch_and_login(email=email, password=password, persistent=persistent_profile)
         print("[Screenshot] 登入完成，開始截圖流程。")
         
         await page.set_viewport_size({"width": 1280, "height": 800})
         print("[Screenshot] 已設定視窗大小為 1280x800")
 
         # 導航到目標頁面，並等待網路空閒
+        track_network(page)
+        metrics = PageMetrics(page) if collect_metrics else None
+        if metrics:
+            await metrics.start()
         await page.goto("https://www.shopback.com.tw/", timeout=10000)
         print("網頁載入中，等待 networkidle 狀態")
         await page.wait_for_url("https://www.shopback.com.tw/", timeout=10000)
@@ -41,7 +48,10 @@ async def capture_rewards_section(email: str, password: str):
             if await page.locator(selector).count() > 0:
                 break
             await page.evaluate("window.scrollBy(0, window.innerHeight)")
-            await asyncio.sleep(1)
+            try:
+                await wait_for_network_quiet(page, 300, 3000)
+            except asyncio.TimeoutError:
+                pass
         await page.wait_for_selector(selector, timeout=5000)
         
         selector = 'div.d_flex.flex_column.gap_16:has-text("旅費通通變回饋")'
@@ -63,20 +73,26 @@ async def capture_rewards_section(email: str, password: str):
             }"""
         )
         
-        await asyncio.sleep(2)
+        readiness = await wait_until_ready(page, section, label="rewards section")
 
         # 截圖並儲存
+        release(output_path)
         await page.screenshot(path=output_path, full_page=False)
         print(f"已將區塊截圖並儲存為：{output_path}")
+        store = ArtifactStore()
+        store.put(output_path, 'rewards_section_screenshot', target='rewards section')
+        store.close()
+
+        if metrics:
+            metrics_path = write_metrics(output_path, await metrics.collect(), readiness=readiness)
+            await metrics.stop()
+            write_run_report(OUTPUT_DIR, [metrics_path])
 
         # 關閉瀏覽器
         await page.context.close()
         print("瀏覽器已關閉，程式結束")
 
 if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description="Screenshot reward section")
-    parser.add_argument('-a', '--account', required=True, help='ShopBack login email')
-    parser.add_argument('-p', '--password', required=True, help='ShopBack login password')
-    args = parser.parse_args()
-        
-    asyncio.run(capture_rewards_section(email=args.account, password=args.password))
+    # 參數解析統一在 cli.py
+    from cli import main
+    sys.exit(main(['capture', 'section', *sys.argv[1:]]))
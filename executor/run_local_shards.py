@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+import subprocess
+from functools import partial
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+# 本機驗證分片流程：產生一個 fixture 站台、用 N 個 process 各跑一個 shard，
+# 最後以 cli.py shard merge 檢查每個頁面剛好被截一次。不需要 ShopBack 帳號。
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+CLI = os.path.join(script_dir, 'cli.py')
+
+PAGE_TEMPLATE = """<!doctype html>
+<html><head><meta charset="utf-8"><title>fixture {i}</title></head>
+<body style="margin:0;font-family:sans-serif">
+{blocks}
+</body></html>
+"""
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def build_fixture_site(root: str, pages: int) -> None:
+    for i in range(pages):
+        blocks = "\n".join(
+            f'<div style="height:400px;background:hsl({(i * 37 + b * 53) % 360},60%,70%)">page {i} block {b}</div>'
+            for b in range(3 + i % 4)
+        )
+        with open(os.path.join(root, f"page_{i}.html"), 'w', encoding='utf-8') as f:
+            f.write(PAGE_TEMPLATE.format(i=i, blocks=blocks))
+
+
+def main(args) -> int:
+    work = tempfile.mkdtemp(prefix='shards_')
+    site = os.path.join(work, 'site')
+    os.makedirs(site)
+    build_fixture_site(site, args.pages)
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), partial(_QuietHandler, directory=site))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    jobs_path = os.path.join(work, 'jobs.json')
+    with open(jobs_path, 'w', encoding='utf-8') as f:
+        json.dump([{'url': f"{base}/page_{i}.html", 'name': f"fixture_{i}"} for i in range(args.pages)], f)
+
+    print(f"[Local] fixture 站台 {base}，{args.pages} 頁，{args.shards} 個 shard，輸出於 {work}")
+    start = time.perf_counter()
+    procs, manifests = [], []
+    for i in range(1, args.shards + 1):
+        manifest = os.path.join(work, f"manifest_{i}.json")
+        manifests.append(manifest)
+        procs.append(subprocess.Popen([
+            sys.executable, CLI, 'capture', 'fullpage', '--no-login',
+            '--jobs', jobs_path, '--shard', f"{i}/{args.shards}",
+            '--manifest', manifest, '--output-dir', os.path.join(work, 'out'),
+            # fixture 截圖不能進正式的 artifact store；每個 shard 各自一份，避免同時寫同一個 SQLite
+            '--store-dir', os.path.join(work, f"artifact_store_{i}"),
+        ]))
+    codes = [p.wait() for p in procs]
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+
+    print(f"[Local] {args.shards} 個 shard 完成，耗時 {elapsed:.1f}s，exit codes={codes}")
+    merge = subprocess.run([sys.executable, CLI, 'shard', 'merge', *manifests, '--jobs', jobs_path])
+    return merge.returncode or max(codes)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run sharded full-page captures against a local fixture site")
+    parser.add_argument('--pages', type=int, default=8, help='fixture 頁面數量')
+    parser.add_argument('--shards', type=int, default=2, help='同時執行的 shard 數量')
+    sys.exit(main(parser.parse_args()))
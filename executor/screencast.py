@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+import time
+import base64
+import asyncio
+from bisect import bisect_left, bisect_right
+from collections import deque
+from playwright.async_api import Page
+
+# 這支模組用 CDP Page.startScreencast 取代逐張 page.screenshot：
+#   - 瀏覽器持續推送 viewport 解析度的畫面（PNG 或 JPEG），不需要每次截圖都重新繪製整頁
+#   - 輪播「切換完成」時，挑出對應那個時間點的畫面寫檔
+#   - 統計收到 / 漏掉的畫面數，以及事件到畫面的延遲
+# 畫面只在內容有變化時才會推送，因此穩定後可能不會再有新畫面，
+# 這時候以事件前最後一張畫面為準，但前提是它晚於輪播停止移動的時間；
+# 否則那張可能是切換到一半的樣子（例如 ack 來不及而被瀏覽器略過），改用 page.screenshot 補拍。
+# 漏掉的畫面以頁面端 rAF 比對：輪播移動中的每一幀都應該推送一張畫面。
+
+FORMATS = ('png', 'jpeg')
+# 事件發生後最多等多久看有沒有更新的畫面（秒）
+FRAME_GRACE = 0.25
+# 保留最近幾張畫面；輪播切換間隔數秒，足夠涵蓋一次切換
+BUFFER_SIZE = 120
+# 移動中的 rAF tick 相隔超過此秒數視為不同次切換；每次切換後再多收這麼久的畫面
+BURST_GAP = 0.1
+FRAME_PAD = 0.05
+
+# 頁面端探針：每個 rAF tick 比對元素的 transform，有變化就記下時間（epoch 秒）
+_MOTION_PROBE_JS = """
+(sel) => {
+  const el = document.querySelector(sel);
+  if (!el) return false;
+  const probe = window.__screencastProbe = { ticks: [], stopped: false };
+  let last = getComputedStyle(el).transform;
+  const loop = (now) => {
+    if (probe.stopped) return;
+    const tf = getComputedStyle(el).transform;
+    if (tf !== last) probe.ticks.push((performance.timeOrigin + now) / 1000);
+    last = tf;
+    requestAnimationFrame(loop);
+  };
+  requestAnimationFrame(loop);
+  return true;
+}
+"""
+_STOP_PROBE_JS = """
+() => {
+  const probe = window.__screencastProbe;
+  if (!probe) return null;
+  probe.stopped = true;
+  return probe.ticks;
+}
+"""
+
+
+def count_dropped(ticks: list[float], frame_times: list[float]) -> int:
+    """把移動中的 tick 依 BURST_GAP 分成多次切換，每次切換收到的畫面比 tick 少多少就算漏掉多少"""
+    bursts = []
+    for t in ticks:
+        if bursts and t - bursts[-1][1] <= BURST_GAP:
+            bursts[-1][1] = t
+            bursts[-1][2] += 1
+        else:
+            bursts.append([t, t, 1])
+    times = sorted(frame_times)
+    dropped = 0
+    for start, end, n in bursts:
+        got = bisect_right(times, end + FRAME_PAD) - bisect_left(times, start)
+        dropped += max(0, n - got)
+    return dropped
+
+
+class Screencaster:
+    """
+    start() 後持續接收畫面；frame_at(ts) 取得事件時間點對應的畫面；stop() 後用 stats() 取統計。
+    ts 與畫面 metadata.timestamp 都是 epoch 秒。
+    有給 motion_selector 時以該元素的 transform 變化統計漏掉的畫面。
+    """
+
+    def __init__(self, page: Page, fmt: str = 'png', quality: int = 90, motion_selector: str | None = None):
+        if fmt not in FORMATS:
+            raise ValueError(f"screencast 格式只支援 {FORMATS}，收到：{fmt}")
+        self.page = page
+        self.fmt = fmt
+        self.quality = quality
+        self.motion_selector = motion_selector
+        self.cdp = None
+        self.frames: deque[dict] = deque(maxlen=BUFFER_SIZE)
+        self.frame_times: list[float] = []
+        self.received = 0
+        self.dropped = None   # 輪播移動中卻沒收到的畫面數，stop() 時計算
+        self.ack_failed = 0
+        self.stale = 0        # 等不到事件後的新畫面，改用停止移動後、事件前的畫面
+        self.fallbacks = 0    # 事件前的畫面早於停止移動，改用 page.screenshot
+        self.latencies: list[float] = []   # 事件後畫面：畫面時間 - 事件時間
+        self.stale_ages: list[float] = []  # stale 畫面：事件時間 - 畫面時間
+        self._new_frame = asyncio.Event()
+
+    async def start(self) -> None:
+        viewport = self.page.viewport_size or await self.page.evaluate(
+            "() => ({ width: window.innerWidth, height: window.innerHeight })")
+        self.cdp = await self.page.context.new_cdp_session(self.page)
+        self.cdp.on("Page.screencastFrame", self._on_frame)
+        params = {
+            "format": self.fmt,
+            "maxWidth": viewport["width"],
+            "maxHeight": viewport["height"],
+            "everyNthFrame": 1,
+        }
+        if self.fmt == 'jpeg':
+            params["quality"] = self.quality
+        await self.cdp.send("Page.startScreencast", params)
+        if self.motion_selector and not await self.page.evaluate(_MOTION_PROBE_JS, self.motion_selector):
+            print(f"[Screencast] 找不到 {self.motion_selector}，不統計漏掉的畫面")
+        print(f"[Screencast] 已開始（{self.fmt}，{viewport['width']}x{viewport['height']}）")
+
+    def _on_frame(self, params: dict) -> None:
+        session = params["sessionId"]
+        self.received += 1
+
+        meta = params.get("metadata", {})
+        frame = {
+            "data": params["data"],
+            "ts": meta.get("timestamp") or time.time(),
+            "meta": meta,
+        }
+        self.frames.append(frame)
+        self.frame_times.append(frame["ts"])
+        self._new_frame.set()
+        # 沒有 ack 瀏覽器就不會送下一張
+        asyncio.ensure_future(self._ack(session))
+
+    async def _ack(self, session: int) -> None:
+        try:
+            await self.cdp.send("Page.screencastFrameAck", {"sessionId": session})
+        except Exception:
+            self.ack_failed += 1
+
+    async def frame_at(self, ts: float, settled_at: float | None = None) -> dict:
+        """
+        回傳事件時間 ts 對應的畫面：
+          - FRAME_GRACE 內有 ts 之後的畫面 → 用第一張
+          - 否則用 ts 之前最後一張（畫面沒變化所以沒推送），但它必須不早於 settled_at
+          - 沒有符合的畫面 → 以 page.screenshot 補拍一張
+        """
+        deadline = time.monotonic() + FRAME_GRACE
+        while True:
+            after = [f for f in self.frames if f["ts"] >= ts]
+            if after:
+                frame = after[0]
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                last = self.frames[-1] if self.frames else None
+                if last is None or (settled_at is not None and last["ts"] < settled_at):
+                    # 最後一張畫面還在切換中（或根本沒有畫面），不能拿來用
+                    self.fallbacks += 1
+                    print("[Screencast] 沒有停止移動後的畫面，改用 page.screenshot")
+                    return await self._screenshot_frame()
+                frame = last
+                self.stale += 1
+                break
+            self._new_frame.clear()
+            try:
+                await asyncio.wait_for(self._new_frame.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+        # stale 畫面早於事件，另外記錄它有多舊，不混進延遲
+        if frame["ts"] >= ts:
+            self.latencies.append(frame["ts"] - ts)
+        else:
+            self.stale_ages.append(ts - frame["ts"])
+        return frame
+
+    async def _screenshot_frame(self) -> dict:
+        """以 page.screenshot 拍目前的 viewport，包成與 screencast 畫面相同的格式"""
+        options = {"type": self.fmt}
+        if self.fmt == 'jpeg':
+            options["quality"] = self.quality
+        data = await self.page.screenshot(**options)
+        width = (self.page.viewport_size or {}).get("width")
+        return {"data": base64.b64encode(data).decode(), "ts": time.time(), "meta": {"deviceWidth": width}}
+
+    async def save_frame_at(self, ts: float, path: str, clip: dict | None = None,
+                            settled_at: float | None = None) -> dict:
+        """把 ts 對應的畫面寫到 path；clip 為 CSS 像素（x, y, width, height），依畫面縮放換算"""
+        frame = await self.frame_at(ts, settled_at)
+        data = base64.b64decode(frame["data"])
+        if clip is None:
+            with open(path, 'wb') as f:
+                f.write(data)
+            return frame
+
+        import cv2
+        import numpy as np
+        img = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        # metadata.deviceWidth 是 CSS 像素寬度；maxWidth 限制下畫面通常是 1:1
+        scale = img.shape[1] / (frame["meta"].get("deviceWidth") or img.shape[1])
+        x, y = int(round(clip["x"] * scale)), int(round(clip["y"] * scale))
+        w, h = int(round(clip["width"] * scale)), int(round(clip["height"] * scale))
+        cv2.imwrite(path, img[y:y + h, x:x + w])
+        return frame
+
+    def stats(self) -> dict:
+        lat = sorted(self.latencies)
+        pick = lambda q: round(lat[min(len(lat) - 1, int(q * len(lat)))] * 1000, 1) if lat else None
+        return {
+            "format": self.fmt,
+            "frames_received": self.received,
+            "frames_dropped": self.dropped,
+            "ack_failed": self.ack_failed,
+            "stale_frames": self.stale,
+            "fallback_screenshots": self.fallbacks,
+            "stale_age_ms_max": round(max(self.stale_ages) * 1000, 1) if self.stale_ages else None,
+            "captures": len(lat) + len(self.stale_ages) + self.fallbacks,
+            # 延遲只統計事件後的畫面
+            "latency_ms_p50": pick(0.5),
+            "latency_ms_p95": pick(0.95),
+            "latency_ms_max": round(lat[-1] * 1000, 1) if lat else None,
+        }
+
+    async def stop(self) -> dict:
+        if self.motion_selector:
+            ticks = await self.page.evaluate(_STOP_PROBE_JS)
+            if ticks is not None:
+                self.dropped = count_dropped(ticks, self.frame_times)
+        if self.cdp is not None:
+            try:
+                await self.cdp.send("Page.stopScreencast")
+            finally:
+                await self.cdp.detach()
+                self.cdp = None
+        stats = self.stats()
+        print(f"[Screencast] 收到 {stats['frames_received']} 張畫面，漏掉 {stats['frames_dropped']} 張，"
+              f"事件後無新畫面 {stats['stale_frames']} 次（最舊 {stats['stale_age_ms_max']}ms），"
+              f"改用 page.screenshot {stats['fallback_screenshots']} 次，延遲 p50={stats['latency_ms_p50']}ms "
+              f"p95={stats['latency_ms_p95']}ms")
+        return stats
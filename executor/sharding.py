@@ -0,0 +1,126 @@
+import os
+import json
+import hashlib
+from datetime import datetime
+from typing import Callable, Iterable, TypeVar
+
+# 這支模組把工作清單依穩定雜湊排序後輪流切成 N 份（--shard i/N，i 從 1 開始），
+# 讓多個 workflow runner 或本機 process 各自處理一份：
+#   - 依 key 的雜湊排名分配（rank % N），各 shard 的數量最多差 1，與清單順序無關
+#   - 清單內容不變時，同一個 key 永遠落在同一個 shard
+#   - 每個 shard 寫一份 manifest，merge_manifests() 檢查沒有漏掉或重複的目標
+
+T = TypeVar('T')
+
+
+def parse_shard(spec: str | None) -> tuple[int, int]:
+    """'2/4' → (2, 4)；None 表示不分片，回傳 (1, 1)"""
+    if not spec:
+        return 1, 1
+    try:
+        i, n = (int(v) for v in spec.split('/'))
+    except ValueError:
+        raise ValueError(f"--shard 格式應為 i/N，收到：{spec}")
+    if n < 1 or not 1 <= i <= n:
+        raise ValueError(f"--shard 需滿足 1 <= i <= N，收到：{spec}")
+    return i, n
+
+
+def key_hash(key: str) -> str:
+    """用 sha1 而非 hash()，跨 process 結果一致"""
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def assign_shards(keys: Iterable[str], n: int) -> dict[str, int]:
+    """
+    回傳每個 key 所屬的 shard（1-based）。直接對雜湊取餘數在清單很短時容易分得很不平均
+    （例如 4 個頁面分成 3/1），因此改成依雜湊排序後輪流分配，各 shard 數量最多差 1。
+    """
+    order = sorted(set(keys), key=lambda k: (key_hash(k), k))
+    return {k: rank % n + 1 for rank, k in enumerate(order)}
+
+
+def select_shard(items: Iterable[T], spec: str | None, key: Callable[[T], str] = str) -> list[T]:
+    """每個 shard 都要拿到同一份完整清單，分配結果才會一致"""
+    i, n = parse_shard(spec)
+    items = list(items)
+    shards = assign_shards((key(item) for item in items), n)
+    return [item for item in items if shards[key(item)] == i]
+
+
+def write_manifest(path: str, spec: str | None, assigned: list[str], results: list[dict]) -> str:
+    """
+    寫出此 shard 的 manifest。results 每筆至少要有 'key' 與 'status'（'ok' / 'error'），
+    其餘欄位（artifact 路徑、Drive ID 等）原樣保留。
+    """
+    i, n = parse_shard(spec)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'shard': f"{i}/{n}",
+            'finished_at': datetime.now().isoformat(timespec='seconds'),
+            'assigned': assigned,
+            'results': results,
+        }, f, ensure_ascii=False, indent=2)
+    print(f"[Shard] {i}/{n} manifest 已寫入 {path}（{len(results)} 筆）")
+    return path
+
+
+def merge_manifests(paths: list[str], expected: list[str] | None = None) -> dict:
+    """
+    合併各 shard 的 manifest，回傳：
+      {'results': [...], 'missing': [...], 'duplicated': [...], 'failed': [...], 'shards': [...], 'ok': bool}
+    expected 為完整工作清單的 key；未提供時以各 manifest 的 assigned 合併作為預期。
+    """
+    results, shards, assigned = [], [], []
+    unreadable = []
+    for path in paths:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                m = json.load(f)
+        except (OSError, ValueError) as e:
+            # shard 中途失敗時可能沒有寫出 manifest，當作檢查失敗而不是直接中斷
+            unreadable.append(f"無法讀取 manifest：{path}（{e.__class__.__name__}）")
+            continue
+        shards.append(m['shard'])
+        assigned.extend(m.get('assigned', []))
+        results.extend(m['results'])
+
+    expected = list(expected) if expected is not None else assigned
+    seen: dict[str, int] = {}
+    for r in results:
+        seen[r['key']] = seen.get(r['key'], 0) + 1
+
+    # 所有 shard 的 N 必須一致，且 1..N 每個 shard 都要出現剛好一次
+    counts = {s.split('/')[1] for s in shards}
+    shard_problems = list(unreadable)
+    if len(counts) > 1:
+        shard_problems.append(f"shard 總數不一致：{sorted(counts)}")
+    elif counts:
+        n = int(counts.pop())
+        present = sorted(int(s.split('/')[0]) for s in shards)
+        if present != list(range(1, n + 1)):
+            shard_problems.append(f"shard 不完整或重複：{present}（預期 1..{n}）")
+
+    report = {
+        'results': results,
+        'shards': shards,
+        'missing': [k for k in expected if k not in seen],
+        'duplicated': sorted(k for k, c in seen.items() if c > 1),
+        'unexpected': sorted(k for k in seen if k not in set(expected)),
+        'failed': [r['key'] for r in results if r.get('status') != 'ok'],
+        'shard_problems': shard_problems,
+    }
+    report['ok'] = not any(report[k] for k in ('missing', 'duplicated', 'unexpected', 'failed', 'shard_problems'))
+    print(f"[Shard] 合併 {len(paths)} 份 manifest：{len(results)} 筆結果，"
+          f"missing={len(report['missing'])} duplicated={len(report['duplicated'])} "
+          f"unexpected={len(report['unexpected'])} failed={len(report['failed'])}")
+    for p in shard_problems:
+        print(f"[Shard] ❌ {p}")
+    return report
+
+
+def load_jobs(path: str) -> list[dict]:
+    """讀取工作清單 JSON：[{"url": ..., "name": ...}, ...]"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
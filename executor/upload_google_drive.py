@@ -2,15 +2,21 @@
 import os
 import json
 import base64
-import argparse
+import sys
+import time
+import random
 from google.auth.transport.requests import Request
-from google.oauth2 import service_account
-from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 from googleapiclient.http import MediaFileUpload
+from artifact_store import ArtifactStore
+from sharding import select_shard, write_manifest
 
 IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff'}
 
+# 與 googleapiclient 相同：這些狀態碼以 exponential backoff 重試
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
 SCOPES = [
     'https://www.googleapis.com/auth/drive.file',
     'https://www.googleapis.com/auth/drive.readonly'
@@ -33,6 +39,8 @@ def authenticate_oauth_from_json(credentials_json_str):
             print("[Auth] 嘗試使用 refresh token 更新")
             creds.refresh(Request())
         else:
+            # 互動式授權只在沒有可用 token 時需要，延後載入 google_auth_oauthlib
+            from google_auth_oauthlib.flow import InstalledAppFlow
             client_config = json.loads(credentials_json_str)
             flow = InstalledAppFlow.from_client_config(client_config, SCOPES)
             creds = flow.run_local_server(port=0)
@@ -48,40 +56,84 @@ def authenticate_oauth_from_json(credentials_json_str):
 def authenticate_service_account_from_json(sa_key_json_str):
     """使用服務帳號金鑰 JSON 字串"""
     print("[Auth] 使用 Service Account 認證")
+    from google.oauth2 import service_account
     key_info = json.loads(sa_key_json_str)
     creds = service_account.Credentials.from_service_account_info(
         key_info, scopes=SCOPES)
     return creds
 
 
-def upload_file_to_drive(drive, file_path, mime_type=None, parent_folder_id=None):
-    """上傳單一檔案到 Google Drive"""
+def execute_resumable(request, num_retries=0):
+    """
+    逐段上傳 resumable request，每一段各自最多重試 num_retries 次。
+    不用 request.execute(num_retries=...)：它重試分段時會重送已讀完的 stream，
+    送出的 body 比 Content-Length 短，連線會卡到伺服器逾時。
+    """
+    response = None
+    retries = 0
+    while response is None:
+        try:
+            _, response = request.next_chunk()
+            retries = 0
+        except HttpError as e:
+            if e.resp.status not in RETRYABLE_STATUS or retries >= num_retries:
+                raise
+            retries += 1
+            print(f"[Upload] 收到 {e.resp.status}，第 {retries} 次重試")
+            time.sleep(random.random() * 2 ** retries)
+    return response
+
+
+def upload_file_to_drive(drive, file_path, mime_type=None, parent_folder_id=None, store=None,
+                         num_retries=0, chunksize=None):
+    """
+    上傳單一檔案到 Google Drive；有給 store 時記錄上傳狀態。
+    num_retries：遇到 429 / 5xx 時重試次數；chunksize（bytes）：改用 resumable upload 分段上傳
+    """
     print(f"[Upload] 開始上傳檔案：{file_path}")
     metadata = {'name': os.path.basename(file_path)}
     if parent_folder_id:
         metadata['parents'] = [parent_folder_id]
 
-    media = MediaFileUpload(file_path, mimetype=mime_type)
+    if chunksize:
+        media = MediaFileUpload(file_path, mimetype=mime_type, chunksize=chunksize, resumable=True)
+    else:
+        media = MediaFileUpload(file_path, mimetype=mime_type)
     try:
-        file = drive.files().create(body=metadata, media_body=media, fields='id').execute()
+        request = drive.files().create(body=metadata, media_body=media, fields='id')
+        if chunksize:
+            file = execute_resumable(request, num_retries=num_retries)
+        else:
+            file = request.execute(num_retries=num_retries)
         print(f"[Upload] ✅ 成功上傳 '{file_path}' → ID: {file.get('id')}")
+        if store is not None:
+            store.mark_uploaded(file_path, file.get('id'))
         return file.get('id')
     except Exception as e:
         print(f"[Upload] ❌ 上傳失敗：{file_path}\n錯誤：{e}")
         return None
 
 
-def upload_folder_to_drive(drive, folder_path, parent_folder_id=None):
-    """上傳整個資料夾內所有圖片檔案"""
+def upload_folder_to_drive(drive, folder_path, parent_folder_id=None, store=None, shard=None,
+                           num_retries=0, chunksize=None):
+    """上傳整個資料夾內所有圖片檔案；有給 shard（i/N）時只上傳依檔名分到此 shard 的檔案"""
     print(f"[Upload] 掃描資料夾：{folder_path}")
-    count = 0
-    for entry in os.listdir(folder_path):
-        full_path = os.path.join(folder_path, entry)
+    entries = []
+    for entry in sorted(os.listdir(folder_path)):
         _, ext = os.path.splitext(entry)
-        if os.path.isfile(full_path) and ext.lower() in IMAGE_EXTENSIONS:
-            upload_file_to_drive(drive, full_path, parent_folder_id=parent_folder_id)
-            count += 1
-    print(f"[Upload] 完成，共上傳 {count} 張圖片")
+        if os.path.isfile(os.path.join(folder_path, entry)) and ext.lower() in IMAGE_EXTENSIONS:
+            entries.append(entry)
+    mine = select_shard(entries, shard)
+    if shard:
+        print(f"[Upload] shard {shard}：{len(mine)} / {len(entries)} 張圖片")
+
+    results = []
+    for entry in mine:
+        file_id = upload_file_to_drive(drive, os.path.join(folder_path, entry), parent_folder_id=parent_folder_id,
+                                       store=store, num_retries=num_retries, chunksize=chunksize)
+        results.append({'key': entry, 'status': 'ok' if file_id else 'error', 'drive_file_id': file_id})
+    print(f"[Upload] 完成，共上傳 {sum(1 for r in results if r['status'] == 'ok')} 張圖片")
+    return mine, results
 
 
 def main(args):
@@ -113,28 +165,28 @@ def main(args):
         print(f"[Main] ❌ 建立 Drive client 失敗：{e}")
         return
 
+    store = ArtifactStore()
+    chunksize = int(args.chunk_size * 1024 * 1024) if args.chunk_size else None
+
     # 檔案或資料夾上傳
     if os.path.isdir(args.local_path):
         print(f"[Main] 偵測到資料夾：{args.local_path}，將上傳所有圖片")
-        upload_folder_to_drive(drive, args.local_path, parent_folder_id=args.drive_folder_id)
+        assigned, results = upload_folder_to_drive(drive, args.local_path, parent_folder_id=args.drive_folder_id,
+                                                   store=store, shard=args.shard,
+                                                   num_retries=args.retries, chunksize=chunksize)
+        if args.manifest:
+            write_manifest(args.manifest, args.shard, assigned, results)
     elif os.path.isfile(args.local_path):
         print(f"[Main] 偵測到單一檔案：{args.local_path}，開始上傳")
-        upload_file_to_drive(drive, args.local_path, parent_folder_id=args.drive_folder_id)
+        upload_file_to_drive(drive, args.local_path, parent_folder_id=args.drive_folder_id, store=store,
+                             num_retries=args.retries, chunksize=chunksize)
     else:
         print(f"[Main] ❌ 錯誤：'{args.local_path}' 不是有效的檔案或資料夾")
 
+    store.close()
+
 
 if __name__ == '__main__':
-    parser = argparse.ArgumentParser(description="Upload a file or all images in a folder to Google Drive")
-    parser.add_argument('-j', '--credentials-json', required=True,
-                        help="OAuth2 or service account JSON string")
-    parser.add_argument('-l', '--local-path', dest='local_path', required=True,
-                        help='Local file or folder path to upload')
-    parser.add_argument('-f', '--drive-folder-id', dest='drive_folder_id', default=None,
-                        help='Google Drive folder ID to upload into')
-    parser.add_argument('--service-account', action='store_true',
-                        help="Interpret credentials JSON as a service account key")
-    parser.add_argument('--token-base64', default=None,
-                        help="(Optional) Base64-encoded token.pickle content")
-    args = parser.parse_args()
-    main(args)
+    # 參數解析統一在 cli.py
+    from cli import main
+    sys.exit(main(['drive', 'upload', *sys.argv[1:]]))